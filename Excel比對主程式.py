@@ -8,14 +8,38 @@ from email.message import EmailMessage
 import smtplib
 from pathlib import Path
 
-from config import APP_NAME, APP_VERSION, APP_FOOTER
+from config import APP_NAME, APP_VERSION, APP_FOOTER, MULTI_SHEET_MAX_WORKERS
 from compare_core import (
-    clean_header_name,
+    default_key_columns,
     build_key_map,
-    count_duplicate_keys,
+    count_duplicates_in_map,
+    count_duplicates_sorted,
+    key_tuples,
+    key_order_pair,
+    is_key_sorted,
+    detect_join,
+    JOIN_HASH,
+    JOIN_MERGE,
+    DIFF_SURPLUS_DUP,
+    SURPLUS_DUP_TEXT,
     diff_directional,
+    diff_directional_wide,
+    summarize_compare,
     build_column_diff,
 )
+from compare_rules import (
+    RULE_TRIM,
+    RULE_IGNORE_CASE,
+    RULE_DATE,
+    RULE_NUMERIC,
+    RULE_LABELS,
+    compile_rules,
+    describe_rules,
+)
+from diff_store import DiffStore
+from telemetry import StageTimer, append_record, process_peak_memory_mb, load_records, write_calibration
+from compare_estimate import estimate_compare
+from compare_workbook import pair_sheets, compare_workbooks
 
 # =========================================================
 # Page config（一定要第一個）
@@ -40,6 +64,27 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 FEEDBACK_XLSX = DATA_DIR / "feedback.xlsx"
 USAGE_XLSX = DATA_DIR / "usage.xlsx"   # 存「系統累積比對次數」
 
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PAGE_SIZE_OPTIONS = [50, 100, 500, 1000]
+WIDE_PREVIEW_ROWS = 100
+
+# Key 對齊方式（None = 自動偵測）；預設雜湊對應，結果與舊版逐列比對相同
+JOIN_OPTIONS = {
+    "雜湊對應（重複 Key 只比第一筆）": JOIN_HASH,
+    "排序合併（重複 Key 依順序對齊）": JOIN_MERGE,
+    "自動偵測（已排序就用排序合併）": None,
+}
+JOIN_LABELS = {
+    JOIN_HASH: "雜湊對應",
+    JOIN_MERGE: "排序合併",
+}
+
+LAYOUT_LONG = "長格式（每個差異欄位一列）"
+LAYOUT_WIDE = "寬格式（每個 Key 一列）"
+
+MODE_SINGLE_SHEET = "單一工作表（各取第一個）"
+MODE_MULTI_SHEET = "多工作表（依名稱配對）"
+
 # =========================================================
 # 工具：台灣時間
 # =========================================================
@@ -51,6 +96,23 @@ def gen_download_filename(base_name: str, suffix="compare", ext="xlsx"):
     seq = int(time.time() * 1000) % 1000
     return f"{base_name}_{suffix}_{ts}_{seq:03d}.{ext}"
 
+def build_result_xlsx(sheets: dict) -> bytes:
+    """
+    sheets: 工作表名稱 -> DataFrame，依序寫成一個 xlsx
+    """
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return output.getvalue()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def read_excel_cached(data: bytes, sheet_name=0):
+    """
+    依檔案內容快取解析結果：翻頁、篩選等 rerun 不用重新解析 Excel
+    """
+    return pd.read_excel(BytesIO(data), sheet_name=sheet_name)
+
 # =========================================================
 # 系統累積比對次數（持久化）
 # =========================================================
@@ -78,6 +140,85 @@ def bump_total_compare_count() -> int:
     set_total_compare_count(n)
     return n
 
+# =========================================================
+# 比對效能紀錄（追加一筆；寫失敗不影響比對）
+# =========================================================
+def record_compare_run(mode: str, timer: StageTimer, **fields) -> None:
+    record = {
+        "time_tw": now_tw().strftime("%Y-%m-%d %H:%M:%S"),
+        "app_version": APP_VERSION,
+        "mode": mode,
+        **fields,
+        "stages": timer.stages,
+        "total_seconds": timer.total,
+        "process_peak_mem_mb": process_peak_memory_mb(),
+    }
+    try:
+        append_record(record)
+    except Exception:
+        pass
+
+# =========================================================
+# 比對規則編輯（預設嚴格；勾選的欄位比對前會整欄先正規化）
+# =========================================================
+def rule_editor(rule_cols: list, key: str) -> dict:
+    """
+    顯示每個欄位一列的規則表，回傳規則寫法 {欄位: [步驟, ...]}（沒勾的欄位不列）
+    """
+    with st.expander("⚙️ 比對規則（進階，預設嚴格比對）"):
+        st.caption("未勾選的欄位維持嚴格比對；數值容差留空代表不做數值比對")
+        df_rules = st.data_editor(
+            pd.DataFrame({
+                "欄位": [str(c) for c in rule_cols],
+                RULE_LABELS[RULE_TRIM]: False,
+                RULE_LABELS[RULE_IGNORE_CASE]: False,
+                RULE_LABELS[RULE_DATE]: False,
+                RULE_LABELS[RULE_NUMERIC]: pd.Series([None] * len(rule_cols), dtype="float64"),
+            }),
+            use_container_width=True,
+            hide_index=True,
+            disabled=["欄位"],
+            column_config={
+                RULE_LABELS[RULE_NUMERIC]: st.column_config.NumberColumn(min_value=0.0, format="%g"),
+            },
+            key=key,
+        )
+
+    rule_spec = {}
+    for col, (_, r) in zip(rule_cols, df_rules.iterrows()):
+        steps = [name for name in (RULE_TRIM, RULE_IGNORE_CASE, RULE_DATE) if r[RULE_LABELS[name]]]
+        if pd.notna(r[RULE_LABELS[RULE_NUMERIC]]):
+            steps.append((RULE_NUMERIC, float(r[RULE_LABELS[RULE_NUMERIC]])))
+        if steps:
+            rule_spec[col] = steps
+
+    if rule_spec:
+        st.info(f"已套用比對規則：{len(rule_spec)} 個欄位")
+    return rule_spec
+
+# =========================================================
+# Key 對齊方式（比對與快速估計共用同一套判斷）
+# =========================================================
+def resolve_join(join_choice: str, df_a, df_b, key_cols_a: list[int], key_cols_b: list[int]):
+    """
+    回傳 (join, order_a, order_b)：
+    - 自動偵測：兩邊都已排序用排序合併，否則雜湊對應
+    - 指定排序合併但資料未排序：join 為 None，由呼叫端顯示錯誤
+    order_a / order_b 為 key_order_pair 的結果（雜湊對應時為 None），後續對齊直接沿用
+    """
+    join = JOIN_OPTIONS[join_choice]
+    if join == JOIN_HASH:
+        return join, None, None
+
+    order_a, order_b = key_order_pair(df_a, df_b, key_cols_a, key_cols_b)
+    if join is None:
+        join = detect_join(order_a, order_b)
+    elif not (is_key_sorted(order_a) and is_key_sorted(order_b)):
+        join = None
+    return join, order_a, order_b
+
+UNSORTED_MERGE_ERROR = "❌ Excel A / B 未依 Key 排序，無法使用排序合併，請改用雜湊對應"
+
 # =========================================================
 # 寄送意見信（可選，有 secrets 才寄）
 # =========================================================
@@ -251,7 +392,8 @@ st.markdown("""
 ### 使用說明
 1. 上傳 Excel A、Excel B  
 2. 勾選 Key 欄位（可多 Key）  
-3. Key 選完後，點擊「開始比對」下載結果  
+3. Key 選完後，點擊「開始比對」  
+4. 在頁面上分頁瀏覽差異，再下載完整結果或只下載篩選後的部分  
 """)
 
 # =========================================================
@@ -273,17 +415,106 @@ if file_a is None or file_b is None:
 # 只要成功進入主流程就算一次活動
 st.session_state.last_active_ts = time.time()
 
-df_a = pd.read_excel(file_a)
-df_b = pd.read_excel(file_b)
+compare_mode = st.radio(
+    "比對模式",
+    [MODE_SINGLE_SHEET, MODE_MULTI_SHEET],
+    horizontal=True,
+)
+
+# =========================================================
+# 多工作表：依名稱配對，每個工作表各自決定 Key，平行比對
+# =========================================================
+if compare_mode == MODE_MULTI_SHEET:
+    read_t0 = time.perf_counter()
+    sheets_a = read_excel_cached(file_a.getvalue(), sheet_name=None)
+    sheets_b = read_excel_cached(file_b.getvalue(), sheet_name=None)
+    read_seconds = time.perf_counter() - read_t0
+
+    pairs, only_a, only_b = pair_sheets(sheets_a.keys(), sheets_b.keys())
+    st.success(f"Excel A：{len(sheets_a)} 個工作表 ｜ Excel B：{len(sheets_b)} 個工作表 ｜ 可配對：{len(pairs)} 組")
+    if only_a:
+        st.warning(f"僅 A 有的工作表：{', '.join(only_a)}")
+    if only_b:
+        st.warning(f"僅 B 有的工作表：{', '.join(only_b)}")
+    st.caption("Key 依各工作表表頭自動決定（PLNNR / VORNR，沒有則取前兩欄）")
+
+    if not pairs:
+        st.error("兩份 Excel 沒有可配對的工作表")
+        st.stop()
+
+    # 規則依欄位名稱套用到每一組工作表
+    sheet_rule_cols = []
+    for a, b in pairs:
+        sheet_rule_cols += [
+            c for c in sheets_a[a].columns
+            if c in sheets_b[b].columns and c not in sheet_rule_cols
+        ]
+    sheet_rule_spec = rule_editor(sheet_rule_cols, key="sheet_rule_editor")
+
+    if not st.button("🟢 開始多工作表比對 🟢", type="primary"):
+        st.stop()
+
+    st.session_state.compare_count_session += 1
+    new_total = bump_total_compare_count()
+    st.session_state.last_active_ts = time.time()
+    st.session_state.warned = False
+
+    with st.spinner("多工作表比對中，請稍候..."):
+        t0 = time.time()
+        timer = StageTimer()
+        timer.add("read", read_seconds)
+        with timer.stage("diff"):
+            df_sheet_summary, df_a_to_b, df_b_to_a = compare_workbooks(
+                sheets_a, sheets_b,
+                max_workers=MULTI_SHEET_MAX_WORKERS,
+                rules=compile_rules(sheet_rule_spec),
+            )
+        with timer.stage("xlsx"):
+            xlsx_bytes = build_result_xlsx({
+                "Summary": df_sheet_summary,
+                "A_to_B": df_a_to_b,
+                "B_to_A": df_b_to_a,
+            })
+        duration = round(time.time() - t0, 2)
+
+    record_compare_run(
+        "multi_sheet", timer,
+        rows_a=sum(len(df) for df in sheets_a.values()),
+        rows_b=sum(len(df) for df in sheets_b.values()),
+        cols_a=sum(df.shape[1] for df in sheets_a.values()),
+        cols_b=sum(df.shape[1] for df in sheets_b.values()),
+        sheets=len(pairs),
+        rule_cols=len(sheet_rule_spec),
+        diff_a_to_b=len(df_a_to_b),
+        diff_b_to_a=len(df_b_to_a),
+        result_rows=len(df_a_to_b) + len(df_b_to_a),
+        result_bytes=len(xlsx_bytes),
+    )
+
+    st.success(f"比對完成（耗時 {duration} 秒，系統累積比對次數：{new_total}）")
+    st.caption(f"比對規則：{describe_rules(sheet_rule_spec)}")
+    st.dataframe(df_sheet_summary, use_container_width=True, hide_index=True)
+
+    st.download_button(
+        "📥 下載多工作表差異比對結果 Excel",
+        data=xlsx_bytes,
+        file_name=gen_download_filename("Excel差異比對結果", suffix="sheets"),
+        mime=XLSX_MIME,
+        on_click="ignore",
+    )
+    st.stop()
+
+read_t0 = time.perf_counter()
+df_a = read_excel_cached(file_a.getvalue())
+df_b = read_excel_cached(file_b.getvalue())
+read_seconds = time.perf_counter() - read_t0
 st.success(f"Excel A：{df_a.shape[0]} 筆 ｜ Excel B：{df_b.shape[0]} 筆")
 
 # Key 設定
 st.subheader("🔑 Key 欄位設定")
 
 cols = list(df_a.columns)
-default_keys = [c for c in cols if clean_header_name(c) in {"PLNNR", "VORNR"}]
-if not default_keys:
-    default_keys = cols[:2]
+default_keys = default_key_columns(cols)
 
 selected_keys = st.multiselect(
     "選擇 Key 欄位（可多選）",
@@ -301,86 +532,441 @@ if missing:
     st.stop()
 
 st.success(f"已選擇 Key：{', '.join(selected_keys)}")
-st.markdown("---")
-
-# ✅ 按鈕：按下就計次、就跑比對（不靠下載）
-start_compare = st.button("🟢 開始差異比對 🟢", type="primary")
-
-if not start_compare:
-    st.stop()
 
 # =========================================================
-# ✅ 計次：只在「這次按鈕觸發的 rerun」加一次
-# （Streamlit button=True 只會在這一次 rerun 成立）
+# 比對規則（預設嚴格；勾選的欄位比對前會整欄先正規化）
 # =========================================================
-st.session_state.compare_count_session += 1
-new_total = bump_total_compare_count()
+rule_cols = [c for c in cols if c in df_b.columns and c not in selected_keys]
+rule_spec = rule_editor(rule_cols, key="rule_editor")
+
+join_choice = st.selectbox(
+    "Key 對齊方式",
+    list(JOIN_OPTIONS),
+    help=(
+        "兩份資料都已依 Key 排序（例如 SAP 依 PLNNR/VORNR 匯出）時，排序合併會依組內順序對齊重複 Key，不會只比第一筆；"
+        "有重複 Key 時結果會與雜湊對應不同，自動偵測遇到已排序資料也會改用排序合併"
+    ),
+)
 
-# 活動時間刷新
-st.session_state.last_active_ts = time.time()
-st.session_state.warned = False
+result_layout = st.radio(
+    "結果格式",
+    [LAYOUT_LONG, LAYOUT_WIDE],
+    horizontal=True,
+    help="寬格式每個有差異的 Key 只佔一列，只列出有變更欄位的 A/B 值，差異欄位多時結果檔小很多",
+)
+
+count_only = st.checkbox("📊 只統計差異筆數（不列出明細，適合大檔快速健康檢查）")
+max_examples = 0
+if count_only:
+    max_examples = int(st.number_input("每個欄位最多列出幾筆範例", min_value=0, max_value=1000, value=5))
+st.markdown("---")
+
+# ✅ 按鈕：按下就計次、就跑比對（不靠下載）
+btn_col1, btn_col2 = st.columns(2)
+with btn_col1:
+    start_compare = st.button("🟢 開始差異比對 🟢", type="primary")
+with btn_col2:
+    start_estimate = st.button("⚡ 快速估計（抽樣）", help="依 Key 雜湊抽樣約 2 萬列比對，推估差異比例、耗時與結果檔大小")
+
+# 這組檔案 + Key 的識別，用來判斷 session 內的結果是否還適用
+run_signature = (
+    file_a.name, file_a.size,
+    file_b.name, file_b.size,
+    tuple(selected_keys),
+    repr(rule_spec),
+    join_choice,
+    result_layout,
+)
 
 # =========================================================
-# 比對執行
+# 快速估計：抽樣比對後推估全量結果（不計入比對次數）
 # =========================================================
-with st.spinner("資料比對中，請稍候..."):
-    t0 = time.time()
+if start_estimate:
+    st.session_state.last_active_ts = time.time()
+    st.session_state.warned = False
 
     key_cols_a = [df_a.columns.get_loc(k) for k in selected_keys]
     key_cols_b = [df_b.columns.get_loc(k) for k in selected_keys]
 
-    map_a = build_key_map(df_a, key_cols_a)
-    map_b = build_key_map(df_b, key_cols_b)
+    with st.spinner("抽樣估計中..."):
+        timer = StageTimer()
+        timer.add("read", read_seconds)
+        with timer.stage("join_detect"):
+            join, _, _ = resolve_join(join_choice, df_a, df_b, key_cols_a, key_cols_b)
+        if join is None:
+            st.error(UNSORTED_MERGE_ERROR)
+            st.stop()
+        calib = write_calibration(load_records())
+        try:
+            with timer.stage("estimate"):
+                df_estimate, df_est_cols, est_info = estimate_compare(
+                    df_a, df_b, key_cols_a, key_cols_b,
+                    rules=compile_rules(rule_spec),
+                    join=join,
+                    write_seconds_per_row=calib["write_seconds_per_row"],
+                    bytes_per_row=calib["bytes_per_row"],
+                )
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+
+    record_compare_run(
+        "estimate", timer,
+        rows_a=df_a.shape[0],
+        rows_b=df_b.shape[0],
+        cols_a=df_a.shape[1],
+        cols_b=df_b.shape[1],
+        key_width=len(selected_keys),
+        join=join,
+        rule_cols=len(rule_spec),
+        sample_rows_a=est_info["sample_rows_a"],
+        sample_rows_b=est_info["sample_rows_b"],
+    )
+
+    st.success(
+        f"估計完成（抽樣 {est_info['fraction']:.1%}：A {est_info['sample_rows_a']} 筆 / "
+        f"B {est_info['sample_rows_b']} 筆，耗時 {est_info['sample_seconds']} 秒，"
+        f"Key 對齊方式：{JOIN_LABELS[join]}）"
+    )
+    st.caption("下限 / 上限為 95% 信賴區間；耗時與檔案大小依抽樣耗時及歷史紀錄推估")
+    st.dataframe(df_estimate, use_container_width=True, hide_index=True)
+    if not df_est_cols.empty:
+        st.markdown("**各欄位推估變更筆數（A → B）**")
+        st.dataframe(df_est_cols, use_container_width=True, hide_index=True)
+
+if start_compare:
+    # =========================================================
+    # ✅ 計次：只在「這次按鈕觸發的 rerun」加一次
+    # （Streamlit button=True 只會在這一次 rerun 成立）
+    # =========================================================
+    st.session_state.compare_count_session += 1
+    new_total = bump_total_compare_count()
+
+    # 活動時間刷新
+    st.session_state.last_active_ts = time.time()
+    st.session_state.warned = False
+
+    timer = StageTimer()
+    timer.add("read", read_seconds)
 
-    dup_a = count_duplicate_keys(df_a, key_cols_a)
-    dup_b = count_duplicate_keys(df_b, key_cols_b)
+    key_cols_a = [df_a.columns.get_loc(k) for k in selected_keys]
+    key_cols_b = [df_b.columns.get_loc(k) for k in selected_keys]
 
-    df_col_diff = build_column_diff(df_a, df_b)
+    # 排序用的 key 每邊只建一次，偵測 / 檢查排序 / 對齊 / 重複數共用
+    with timer.stage("join_detect"):
+        join, order_a, order_b = resolve_join(join_choice, df_a, df_b, key_cols_a, key_cols_b)
+    if join is None:
+        st.error(UNSORTED_MERGE_ERROR)
+        st.stop()
+    join_label = JOIN_LABELS[join]
+
+    run_fields = dict(
+        rows_a=df_a.shape[0],
+        rows_b=df_b.shape[0],
+        cols_a=df_a.shape[1],
+        cols_b=df_b.shape[1],
+        key_width=len(selected_keys),
+        join=join,
+        rule_cols=len(rule_spec),
+        layout="wide" if result_layout == LAYOUT_WIDE else "long",
+    )
 
-    a_rows, _, _, _ = diff_directional(df_a, df_b, map_a, map_b, key_cols_a, "A", "B")
-    b_rows, _, _, _ = diff_directional(df_b, df_a, map_b, map_a, key_cols_b, "B", "A")
+    # =========================================================
+    # 只統計：不產生差異明細，直接給各欄位筆數 + 少量範例
+    # =========================================================
+    if count_only:
+        with st.spinner("差異統計中，請稍候..."):
+            t0 = time.time()
+            with timer.stage("diff"):
+                df_counts, df_examples, stats = summarize_compare(
+                    df_a, df_b, key_cols_a, key_cols_b,
+                    rules=compile_rules(rule_spec),
+                    max_examples=max_examples,
+                    join=join,
+                    order_a=order_a,
+                    order_b=order_b,
+                )
+            surplus_rows = []
+            if join == JOIN_MERGE:
+                surplus_rows = [
+                    ["A 重複 Key 多出列數（B 無對應列）", stats["surplus_a"], "", "", ""],
+                    ["B 重複 Key 多出列數（A 無對應列）", stats["surplus_b"], "", "", ""],
+                ]
+            df_summary = pd.DataFrame([
+                ["Key 欄位", ", ".join(selected_keys), "", "", ""],
+                ["比對規則", describe_rules(rule_spec), "", "", ""],
+                ["Key 對齊方式", join_label, "", "", ""],
+                ["A 重複 Key 列數", stats["dup_a"], "", "", ""],
+                ["B 重複 Key 列數", stats["dup_b"], "", "", ""],
+                *surplus_rows,
+                ["A 有、B 無的 Key 列數", stats["missing_in_b"], "", "", ""],
+                ["B 有、A 無的 Key 列數", stats["missing_in_a"], "", "", ""],
+                ["A → B 差異列數", int(df_counts["A→B"].sum()), "", "", ""],
+                ["B → A 差異列數", int(df_counts["B→A"].sum()), "", "", ""],
+                ["系統累積比對次數", new_total, "", "", ""],
+                ["本次登入比對次數", st.session_state.compare_count_session, "", "", ""],
+            ], columns=["項目", "值1", "值2", "值3", "值4"])
+            with timer.stage("xlsx"):
+                xlsx_bytes = build_result_xlsx({
+                    "Summary": df_summary,
+                    "ColumnCounts": df_counts,
+                    "Examples": df_examples,
+                })
+            duration = round(time.time() - t0, 2)
+
+        record_compare_run(
+            "count_only", timer, **run_fields,
+            diff_a_to_b=int(df_counts["A→B"].sum()),
+            diff_b_to_a=int(df_counts["B→A"].sum()),
+            result_rows=len(df_examples),
+            result_bytes=len(xlsx_bytes),
+        )
+
+        st.success(f"統計完成（耗時 {duration} 秒）")
+        st.caption(f"Key 對齊方式：{join_label}｜A 重複 Key {stats['dup_a']} 列 ｜ B 重複 Key {stats['dup_b']} 列")
+        st.dataframe(df_summary, use_container_width=True, hide_index=True)
+        st.markdown("**各欄位差異筆數**")
+        st.dataframe(df_counts, use_container_width=True, hide_index=True)
+        if not df_examples.empty:
+            st.markdown(f"**差異範例（每欄最多 {max_examples} 筆）**")
+            st.dataframe(df_examples, use_container_width=True, hide_index=True)
+
+        st.download_button(
+            "📥 下載差異統計 Excel",
+            data=xlsx_bytes,
+            file_name=gen_download_filename("Excel差異統計結果", suffix="summary"),
+            mime=XLSX_MIME,
+            on_click="ignore",
+        )
+        st.stop()
 
-    key_headers = [f"KEY_{i+1}" for i in range(len(selected_keys))]
-    headers = key_headers + ["差異欄位", "A值", "B值", "差異來源"]
+    # =========================================================
+    # 比對執行（結果留在 server 端，Excel 等下載時才產生）
+    # =========================================================
+    with st.spinner("資料比對中，請稍候..."):
+        t0 = time.time()
+
+        with timer.stage("key_map"):
+            keys_a = key_tuples(df_a, key_cols_a)
+            keys_b = key_tuples(df_b, key_cols_b)
+            if join == JOIN_MERGE:
+                # 排序合併不需要 key map，重複數直接看相鄰的 key
+                map_a = map_b = None
+                dup_a = count_duplicates_sorted(order_a)
+                dup_b = count_duplicates_sorted(order_b)
+            else:
+                map_a = build_key_map(df_a, key_cols_a, keys_a)
+                map_b = build_key_map(df_b, key_cols_b, keys_b)
+                dup_a = count_duplicates_in_map(map_a)
+                dup_b = count_duplicates_in_map(map_b)
+        # 各欄位的字串 / 規則轉換每邊只做一次，兩個方向共用
+        prepared_a, prepared_b = {}, {}
+        side_a = dict(keys_src=keys_a, order_src=order_a, order_tgt=order_b, prepared_src=prepared_a, prepared_tgt=prepared_b)
+        side_b = dict(keys_src=keys_b, order_src=order_b, order_tgt=order_a, prepared_src=prepared_b, prepared_tgt=prepared_a)
+
+        df_col_diff = build_column_diff(df_a, df_b)
+
+        key_headers = [f"KEY_{i+1}" for i in range(len(selected_keys))]
+        headers = key_headers + ["差異欄位", "A值", "B值", "差異來源"]
+        # 寬格式「變更欄位」位元字串的欄位順序（兩個方向一致，以 A 的欄位順序為準）
+        compare_order = [c for c in df_a.columns if c in df_b.columns and c not in selected_keys]
+
+        with timer.stage("diff"):
+            rules = compile_rules(rule_spec)
+            if result_layout == LAYOUT_WIDE:
+                # 寬格式直接由比對結果產生，不經過長格式
+                df_a_to_b = diff_directional_wide(
+                    df_a, df_b, map_b, key_cols_a, "A", "B",
+                    rules=rules, join=join, columns=compare_order, **side_a,
+                )
+                df_b_to_a = diff_directional_wide(
+                    df_b, df_a, map_a, key_cols_b, "B", "A",
+                    rules=rules, join=join, columns=compare_order, **side_b,
+                )
+            else:
+                a_rows, _, _, _ = diff_directional(
+                    df_a, df_b, map_a, map_b, key_cols_a, "A", "B", rules=rules, join=join, **side_a
+                )
+                b_rows, _, _, _ = diff_directional(
+                    df_b, df_a, map_b, map_a, key_cols_b, "B", "A", rules=rules, join=join, **side_b
+                )
 
-    df_a_to_b = pd.DataFrame(a_rows, columns=headers)
-    df_b_to_a = (
-        pd.DataFrame(
-            b_rows,
-            columns=key_headers + ["差異欄位", "B值", "A值", "差異來源"]
-        )[headers]
-        if b_rows else pd.DataFrame(columns=headers)
+                df_a_to_b = pd.DataFrame(a_rows, columns=headers)
+                df_b_to_a = pd.DataFrame(b_rows, columns=headers)
+
+        surplus_rows = []
+        if join == JOIN_MERGE:
+            # 重複 Key 多出：長格式看差異欄位，寬格式看狀態
+            if result_layout == LAYOUT_WIDE:
+                surplus_a = int((df_a_to_b["狀態"] == SURPLUS_DUP_TEXT.format("B")).sum())
+                surplus_b = int((df_b_to_a["狀態"] == SURPLUS_DUP_TEXT.format("A")).sum())
+            else:
+                surplus_a = int((df_a_to_b["差異欄位"] == DIFF_SURPLUS_DUP).sum())
+                surplus_b = int((df_b_to_a["差異欄位"] == DIFF_SURPLUS_DUP).sum())
+            surplus_rows = [
+                ["A 重複 Key 多出列數（B 無對應列）", surplus_a, "", "", ""],
+                ["B 重複 Key 多出列數（A 無對應列）", surplus_b, "", "", ""],
+            ]
+
+        df_summary = pd.DataFrame([
+            ["Key 欄位", ", ".join(selected_keys), "", "", ""],
+            ["比對規則", describe_rules(rule_spec), "", "", ""],
+            ["結果格式", result_layout, "", "", ""],
+            ["Key 對齊方式", join_label, "", "", ""],
+            ["A 重複 Key 列數", dup_a, "", "", ""],
+            ["B 重複 Key 列數", dup_b, "", "", ""],
+            *surplus_rows,
+            ["A → B 差異列數", len(df_a_to_b), "", "", ""],
+            ["B → A 差異列數", len(df_b_to_a), "", "", ""],
+            ["系統累積比對次數", new_total, "", "", ""],
+            ["本次登入比對次數", st.session_state.compare_count_session, "", "", ""],
+        ], columns=["項目", "值1", "值2", "值3", "值4"])
+
+        if result_layout == LAYOUT_WIDE:
+            bit_order = ", ".join(f"{i+1}:{c}" for i, c in enumerate(compare_order))
+            df_summary.loc[len(df_summary)] = ["變更欄位順序（位元字串由左至右）", bit_order, "", "", ""]
+            store = None
+        else:
+            with timer.stage("store"):
+                store = DiffStore(df_a_to_b, df_b_to_a, key_headers)
+
+        st.session_state.diff_result = {
+            "signature": run_signature,
+            "summary": df_summary,
+            "col_diff": df_col_diff,
+            "store": store,
+            "wide": (df_a_to_b, df_b_to_a) if store is None else None,
+            "duration": round(time.time() - t0, 2),
+            "join_note": f"Key 對齊方式：{join_label}｜A 重複 Key {dup_a} 列 ｜ B 重複 Key {dup_b} 列",
+            "run_fields": run_fields,
+        }
+
+    # Excel 等下載時才產生，檔案大小與寫檔耗時記在下載那一筆（xlsx_download）
+    if store is None:
+        result_mem_bytes = int(df_a_to_b.memory_usage(deep=True).sum() + df_b_to_a.memory_usage(deep=True).sum())
+    else:
+        result_mem_bytes = store.memory_bytes()
+    record_compare_run(
+        "full", timer, **run_fields,
+        diff_a_to_b=len(df_a_to_b),
+        diff_b_to_a=len(df_b_to_a),
+        result_rows=len(df_a_to_b) + len(df_b_to_a),
+        result_mem_bytes=result_mem_bytes,
     )
 
-    df_summary = pd.DataFrame([
-        ["Key 欄位", ", ".join(selected_keys), "", "", ""],
-        ["A 重複 Key 列數", dup_a, "", "", ""],
-        ["B 重複 Key 列數", dup_b, "", "", ""],
-        ["A → B 差異列數", len(df_a_to_b), "", "", ""],
-        ["B → A 差異列數", len(df_b_to_a), "", "", ""],
-        ["系統累積比對次數", new_total, "", "", ""],
-        ["本次登入比對次數", st.session_state.compare_count_session, "", "", ""],
-    ], columns=["項目", "值1", "值2", "值3", "值4"])
+result = st.session_state.get("diff_result")
+if result is None or result["signature"] != run_signature:
+    st.stop()
 
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df_summary.to_excel(writer, "Summary", index=False)
-        df_col_diff.to_excel(writer, "ColumnDiff", index=False)
-        df_a_to_b.to_excel(writer, "A_to_B", index=False)
-        df_b_to_a.to_excel(writer, "B_to_A", index=False)
+store = result["store"]
 
-    duration = round(time.time() - t0, 2)
 
-st.success(f"比對完成（耗時 {duration} 秒）")
+def build_full_result_xlsx() -> bytes:
+    """
+    按下下載時才產生完整結果；寫檔耗時與檔案大小另記一筆，給快速估計校正用
+    """
+    timer = StageTimer()
+    with timer.stage("xlsx"):
+        if store is None:
+            df_ab, df_ba = result["wide"]
+        else:
+            df_all = store.select()
+            df_ab = df_all[df_all["差異來源"] == "A→B"]
+            df_ba = df_all[df_all["差異來源"] == "B→A"]
+        xlsx_bytes = build_result_xlsx({
+            "Summary": result["summary"],
+            "ColumnDiff": result["col_diff"],
+            "A_to_B": df_ab,
+            "B_to_A": df_ba,
+        })
+    record_compare_run(
+        "xlsx_download", timer, **result["run_fields"],
+        result_rows=len(df_ab) + len(df_ba),
+        result_bytes=len(xlsx_bytes),
+    )
+    return xlsx_bytes
 
-download_filename = gen_download_filename("Excel差異比對結果")
 
-st.download_button(
-    "📥 下載差異比對結果 Excel",
-    data=output.getvalue(),
-    file_name=download_filename,
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-)
+if store is None:
+    # =========================================================
+    # 寬格式：每個有差異的 Key 一列，直接預覽前幾列
+    # =========================================================
+    df_ab, df_ba = result["wide"]
+    st.success(
+        f"比對完成（耗時 {result['duration']} 秒）｜"
+        f"A → B 差異 Key {len(df_ab)} 筆 ｜ B → A 差異 Key {len(df_ba)} 筆"
+    )
+    st.caption(result["join_note"])
+    st.download_button(
+        "📥 下載差異比對結果 Excel（寬格式）",
+        data=build_full_result_xlsx,
+        file_name=gen_download_filename("Excel差異比對結果", suffix="wide"),
+        mime=XLSX_MIME,
+        on_click="ignore",
+    )
+
+    st.caption(f"預覽前 {WIDE_PREVIEW_ROWS} 列；「變更欄位」的欄位順序見 Summary")
+    tab_ab, tab_ba = st.tabs(["A → B", "B → A"])
+    with tab_ab:
+        st.dataframe(df_ab.head(WIDE_PREVIEW_ROWS), use_container_width=True, hide_index=True)
+    with tab_ba:
+        st.dataframe(df_ba.head(WIDE_PREVIEW_ROWS), use_container_width=True, hide_index=True)
+else:
+    st.success(f"比對完成（耗時 {result['duration']} 秒）｜差異共 {len(store)} 筆")
+    st.caption(result["join_note"])
+
+    st.download_button(
+        "📥 下載差異比對結果 Excel",
+        data=build_full_result_xlsx,
+        file_name=gen_download_filename("Excel差異比對結果"),
+        mime=XLSX_MIME,
+        on_click="ignore",
+    )
+
+    # =========================================================
+    # 差異瀏覽（分頁，直接向 server 取該頁資料）
+    # =========================================================
+    st.subheader("🔎 差異瀏覽")
+
+    counts = store.column_counts()
+    if not counts.empty:
+        st.markdown("**各欄位差異筆數**")
+        st.dataframe(counts, use_container_width=True, hide_index=True)
+
+    f1, f2, f3 = st.columns([2, 1, 1])
+    with f1:
+        filter_cols = st.multiselect("差異欄位", options=store.diff_columns)
+    with f2:
+        filter_sources = st.multiselect("差異來源", options=store.sources)
+    with f3:
+        filter_key = st.text_input("Key 前綴（多 Key 以 | 串接）").strip()
+
+    p1, p2 = st.columns(2)
+    with p2:
+        page_size = st.selectbox("每頁筆數", PAGE_SIZE_OPTIONS, index=1)
+
+    filters = dict(columns=filter_cols, sources=filter_sources, key_prefix=filter_key)
+    filtered_total = store.count(**filters)
+    page_count = max((filtered_total + page_size - 1) // page_size, 1)
+
+    with p1:
+        page_no = st.number_input(f"頁碼（共 {page_count} 頁）", min_value=1, max_value=page_count, value=1)
+
+    df_page, _ = store.page(int(page_no), page_size, **filters)
+    st.caption(f"符合條件 {filtered_total} 筆")
+    st.dataframe(df_page, use_container_width=True, hide_index=True)
+
+    def build_subset_xlsx() -> bytes:
+        return build_result_xlsx({"Diff": store.select(**filters)})
+
+    st.download_button(
+        "📥 只下載目前篩選結果 Excel",
+        data=build_subset_xlsx,
+        file_name=gen_download_filename("Excel差異比對結果", suffix="subset"),
+        mime=XLSX_MIME,
+        on_click="ignore",
+        disabled=filtered_total == 0,
+    )
 
 # =========================================================
 # Footer
@@ -1,5 +1,10 @@
+from itertools import islice, pairwise
+
+import numpy as np
 import pandas as pd
 
+from compare_rules import STRICT_RULE
+
 # =========================
 # Strict mode helpers
 # =========================
@@ -23,6 +28,27 @@ def values_equal_strict(a, b) -> bool:
     return normalize_raw_value(a) == normalize_raw_value(b)
 
 
+def row_values(df: pd.DataFrame, col_pos: int) -> pd.Series:
+    """
+    取出某一欄「逐列讀取時」會拿到的值（object）：
+    iterrows 每列都會轉成整張表的共同型別（例如全數值表 int 會變 float），
+    這裡照做，讓整欄處理的結果與逐列讀取一致
+    """
+    common = df.iloc[:0].to_numpy().dtype
+    s = df.iloc[:, col_pos]
+    if common != object:
+        s = pd.Series(s.to_numpy(dtype=common), index=s.index)
+    return s.astype(object)
+
+
+def strict_text(df: pd.DataFrame, col_pos: int) -> pd.Series:
+    """
+    整欄版的 normalize_raw_value：NaN / None → 空字串，其他 → str
+    """
+    s = row_values(df, col_pos)
+    return s.astype(str).where(s.notna(), "").astype(object)
+
+
 # =========================
 # Header helpers
 # =========================
@@ -38,6 +64,20 @@ def clean_header_name(name) -> str:
     return s
 
 
+DEFAULT_KEY_HEADERS = {"PLNNR", "VORNR"}
+
+
+def default_key_columns(columns) -> list:
+    """
+    預設 Key：表頭為 PLNNR / VORNR 的欄位，沒有的話取前兩欄
+    """
+    cols = list(columns)
+    keys = [c for c in cols if clean_header_name(c) in DEFAULT_KEY_HEADERS]
+    if not keys:
+        keys = cols[:2]
+    return keys
+
+
 # =========================
 # Key helpers
 # =========================
@@ -55,13 +95,30 @@ def make_key_tuple(row, key_cols):
     return tuple(normalize_key_value(row.iloc[i]) for i in key_cols)
 
 
-def build_key_map(df: pd.DataFrame, key_cols: list[int]):
+def key_tuples(df: pd.DataFrame, key_cols: list[int]) -> list[tuple]:
+    """
+    整欄版的 make_key_tuple：回傳每一列的 key tuple（依列順序）
+    """
+    parts = key_text_columns(df, key_cols)
+    return list(zip(*parts)) if parts else [()] * len(df)
+
+
+def key_text_columns(df: pd.DataFrame, key_cols: list[int]) -> list[pd.Series]:
+    """
+    每個 key 欄位整欄做 normalize_key_value（嚴格字串 + 去前後空白）
+    """
+    return [strict_text(df, i).str.strip() for i in key_cols]
+
+
+def build_key_map(df: pd.DataFrame, key_cols: list[int], keys: list[tuple] | None = None):
     """
     回傳 dict: key_tuple -> list[row_index]
+    keys：已算好的 key_tuples（省得重算）
     """
+    if keys is None:
+        keys = key_tuples(df, key_cols)
     key_map = {}
-    for idx, row in df.iterrows():
-        k = make_key_tuple(row, key_cols)
+    for idx, k in zip(df.index, keys):
         key_map.setdefault(k, []).append(idx)
     return key_map
 
@@ -70,12 +127,14 @@ def count_duplicate_keys(df: pd.DataFrame, key_cols: list[int]) -> int:
     """
     回傳重複 key 的列數（不含第一筆）
     """
-    m = build_key_map(df, key_cols)
-    dup = 0
-    for idxs in m.values():
-        if len(idxs) > 1:
-            dup += (len(idxs) - 1)
-    return dup
+    return count_duplicates_in_map(build_key_map(df, key_cols))
+
+
+def count_duplicates_in_map(key_map: dict) -> int:
+    """
+    從 build_key_map 的結果計算重複 key 列數（不含第一筆）
+    """
+    return sum(len(idxs) - 1 for idxs in key_map.values() if len(idxs) > 1)
 
 
 # =========================
@@ -110,9 +169,286 @@ def build_column_diff(df_a: pd.DataFrame, df_b: pd.DataFrame) -> pd.DataFrame:
 
 
 # =========================
-# Directional diff (Strict)
+# Key alignment
 # =========================
 
+JOIN_HASH = "hash"    # 雜湊對應：重複 key 一律對 tgt 第一筆
+JOIN_MERGE = "merge"  # 排序合併：兩邊依 key 排序後同步走，重複 key 依組內順序對齊
+
+# 對齊結果（tgt 列位置）的特殊值
+NO_KEY = -1        # tgt 沒有這個 key
+SURPLUS_DUP = -2   # key 存在，但 src 的重複列比 tgt 多，這一列沒有對應列（只有 merge 會出現）
+
+# 差異欄位的特殊值
+DIFF_NO_KEY = "(Key不存在)"
+DIFF_SURPLUS_DUP = "(重複Key多出)"
+SURPLUS_DUP_TEXT = "重複Key多出一筆（{}無對應列）"
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_)) and v == v
+
+
+def _is_numeric_key_column(df: pd.DataFrame, col_pos: int) -> bool:
+    """
+    key 欄位的值是否全是數值（空值不算）
+    """
+    s = df.iloc[:, col_pos]
+    if s.dtype.kind in "iuf":
+        return True
+    if s.dtype != object:
+        return False
+    return all(_is_number(v) for v in s.dropna().tolist())
+
+
+def key_order_tuples(df: pd.DataFrame, key_cols: list[int], numeric: list[bool]) -> list[tuple]:
+    """
+    排序合併用的 key（兩邊要用同一組 numeric，請用 key_order_pair）：
+    - numeric 為 True 的 key 欄位依數值大小排序（例如 10 < 20 < 100），
+      每個值轉成 (0, 數值, key 字串)，空值為 (1, 0, "") 排在最後
+    - 其他 key 欄位直接用 key 字串排序
+    兩個 tuple 相等時 key 字串一定相等，反之亦然，與雜湊對應判斷同 key 的方式一致
+    """
+    parts = []
+    for i, text, is_num in zip(key_cols, key_text_columns(df, key_cols), numeric):
+        if not is_num:
+            parts.append(text.tolist())
+            continue
+        parts.append([
+            (0, v, t) if _is_number(v) else (1, 0, t)
+            for v, t in zip(row_values(df, i).tolist(), text.tolist())
+        ])
+    return list(zip(*parts)) if parts else [()] * len(df)
+
+
+def key_order_pair(
+    df_a: pd.DataFrame,
+    df_b: pd.DataFrame,
+    key_cols_a: list[int],
+    key_cols_b: list[int],
+) -> tuple[list[tuple], list[tuple]]:
+    """
+    兩邊一起建排序合併用的 key：同一個 key 欄位兩邊都是數值才依數值排序，
+    否則兩邊都依 key 字串排序（例如一邊 PLNNR 是數字、一邊是文字時）
+    """
+    numeric = [
+        _is_numeric_key_column(df_a, i) and _is_numeric_key_column(df_b, j)
+        for i, j in zip(key_cols_a, key_cols_b)
+    ]
+    return key_order_tuples(df_a, key_cols_a, numeric), key_order_tuples(df_b, key_cols_b, numeric)
+
+
+def is_key_sorted(keys: list[tuple]) -> bool:
+    """
+    key_order_pair 的 key 是否已遞增排序（允許重複）
+    """
+    return all(a <= b for a, b in pairwise(keys))
+
+
+def detect_join(keys_a: list[tuple], keys_b: list[tuple]) -> str:
+    """
+    keys_a / keys_b：key_order_pair 的結果；
+    兩邊都已依 key 排序就用排序合併，否則用雜湊對應
+    """
+    if is_key_sorted(keys_a) and is_key_sorted(keys_b):
+        return JOIN_MERGE
+    return JOIN_HASH
+
+
+def count_duplicates_sorted(keys: list[tuple]) -> int:
+    """
+    已排序 key 的重複列數（不含第一筆），不需建 key map
+    """
+    return sum(1 for a, b in pairwise(keys) if a == b)
+
+
+def merge_align(keys_src: list[tuple], keys_tgt: list[tuple]) -> np.ndarray:
+    """
+    排序合併對齊（keys_src / keys_tgt 為 key_order_pair 的結果，由呼叫端每邊建一次）：
+    兩邊同步往前走，不另外建 key map（記憶體只有傳入的 key 與輸出陣列），
+    走的同時順便檢查排序，不用先另外掃一遍。
+    同一個 key 有多筆時，依組內順序一對一對齊（第 1 筆對第 1 筆…），
+    tgt 沒有的 key 回傳 NO_KEY，同 key 但 src 多出來的列回傳 SURPLUS_DUP
+    """
+    n, m = len(keys_src), len(keys_tgt)
+    tgt_of = np.full(n, NO_KEY)
+    i = j = 0
+    while i < n and j < m:
+        ks, kt = keys_src[i], keys_tgt[j]
+        if ks < kt:
+            i += 1
+        elif ks > kt:
+            j += 1
+        else:
+            while i < n and j < m and keys_src[i] == ks and keys_tgt[j] == ks:
+                tgt_of[i] = j
+                i += 1
+                j += 1
+            while i < n and keys_src[i] == ks:
+                tgt_of[i] = SURPLUS_DUP
+                i += 1
+            while j < m and keys_tgt[j] == ks:
+                j += 1
+        if (0 < i < n and keys_src[i] < keys_src[i - 1]) or (0 < j < m and keys_tgt[j] < keys_tgt[j - 1]):
+            raise ValueError("資料未依 Key 排序，無法使用排序合併對齊")
+
+    # 其中一邊走完後，另一邊剩下的部分還沒檢查過
+    for keys, pos in ((keys_src, i), (keys_tgt, j)):
+        if not is_key_sorted(islice(keys, max(pos - 1, 0), None)):
+            raise ValueError("資料未依 Key 排序，無法使用排序合併對齊")
+    return tgt_of
+
+
+def hash_align(keys_src: list[tuple], df_tgt: pd.DataFrame, map_tgt: dict) -> np.ndarray:
+    """
+    雜湊對應：每列 src 對到 tgt 同 key 的第一筆
+    """
+    first_tgt = {k: idxs[0] for k, idxs in map_tgt.items()}
+    tgt_labels = [first_tgt.get(k) for k in keys_src]
+    matched = np.fromiter((lbl is not None for lbl in tgt_labels), dtype=bool, count=len(keys_src))
+    src_pos = np.flatnonzero(matched)
+
+    tgt_of = np.full(len(keys_src), NO_KEY)
+    tgt_of[src_pos] = df_tgt.index.get_indexer([tgt_labels[i] for i in src_pos])
+    return tgt_of
+
+
+# =========================
+# Directional diff
+# =========================
+
+def _directional_hits(
+    df_src: pd.DataFrame,
+    df_tgt: pd.DataFrame,
+    map_tgt: dict,
+    key_cols_src: list[int],
+    rules: dict | None = None,
+    join: str = JOIN_HASH,
+    keys_src: list[tuple] | None = None,
+    order_src: list[tuple] | None = None,
+    order_tgt: list[tuple] | None = None,
+    prepared_src: dict | None = None,
+    prepared_tgt: dict | None = None,
+) -> dict:
+    """
+    差異比對核心（只找出差異位置，不產生輸出列）。
+    keys_src（key_tuples）、order_src / order_tgt（key_order_pair，merge 才用）
+    可由呼叫端先算好傳入，同一邊的 key 只建一次；沒傳就在這裡算。
+    prepared_src / prepared_tgt：各邊欄位的顯示字串與規則轉換結果（見 _prepared_column），
+    雙向比對時同一邊傳同一個 dict，第一個方向算好後第二個方向直接沿用。回傳：
+    - keys：src 每一列的 key tuple
+    - missing_pos：Key 不存在於 tgt 的 src 列位置
+    - surplus_pos：key 存在但重複列比 tgt 多、沒有對應列的 src 列位置（只有 merge）
+    - tgt_of：src 列位置 → tgt 列位置（NO_KEY / SURPLUS_DUP 表示沒對到；
+      hash 重複 key 取第一筆，merge 依組內順序對齊，此時 map_tgt 用不到）
+    - compare_cols / col_hits：每個比對欄位有差異的 src 列位置
+    - texts：有差異欄位的 (src 顯示字串, tgt 顯示字串)
+    """
+    common_cols = [c for c in df_src.columns if c in df_tgt.columns]
+    key_names = [df_src.columns[i] for i in key_cols_src]
+    compare_cols = [c for c in common_cols if c not in key_names]
+    rules = rules or {}
+
+    keys = keys_src if keys_src is not None else key_tuples(df_src, key_cols_src)
+
+    if join == JOIN_MERGE:
+        if order_src is None or order_tgt is None:
+            key_cols_tgt = [df_tgt.columns.get_loc(k) for k in key_names]
+            order_src, order_tgt = key_order_pair(df_src, df_tgt, key_cols_src, key_cols_tgt)
+        tgt_of = merge_align(order_src, order_tgt)
+    elif join == JOIN_HASH:
+        tgt_of = hash_align(keys, df_tgt, map_tgt)
+    else:
+        raise ValueError(f"未知的 Key 對齊方式：{join}")
+
+    matched = tgt_of >= 0
+    src_pos = np.flatnonzero(matched)
+    tgt_pos = tgt_of[src_pos]
+
+    prepared_src = {} if prepared_src is None else prepared_src
+    prepared_tgt = {} if prepared_tgt is None else prepared_tgt
+
+    col_hits = []
+    texts = {}
+    for j, col in enumerate(compare_cols):
+        rule = rules.get(col, STRICT_RULE)
+        src_text, prep_src = _prepared_column(prepared_src, df_src, col, rule)
+        tgt_text, prep_tgt = _prepared_column(prepared_tgt, df_tgt, col, rule)
+
+        if rule.is_strict:
+            same = src_text[src_pos] == tgt_text[tgt_pos]
+        else:
+            same = rule.equal(_take(prep_src, src_pos), _take(prep_tgt, tgt_pos))
+
+        hits = src_pos[np.flatnonzero(~np.asarray(same, dtype=bool))]
+        col_hits.append(hits)
+        if len(hits):
+            texts[j] = (src_text, tgt_text)
+
+    return {
+        "keys": keys,
+        "missing_pos": np.flatnonzero(tgt_of == NO_KEY),
+        "surplus_pos": np.flatnonzero(tgt_of == SURPLUS_DUP),
+        "matched_keys": len(src_pos),
+        "tgt_of": tgt_of,
+        "compare_cols": compare_cols,
+        "col_hits": col_hits,
+        "texts": texts,
+    }
+
+
+def _prepared_column(prepared: dict, df: pd.DataFrame, col, rule):
+    """
+    取某一欄的 (顯示字串陣列, rule.prepare 結果)，第一次用到才算，之後從 prepared 取；
+    嚴格比對的欄位不需要 prepare，回傳 None
+    """
+    if col not in prepared:
+        text = strict_text(df, df.columns.get_loc(col)).to_numpy()
+        prep = None if rule.is_strict else rule.prepare(pd.Series(text))
+        prepared[col] = (text, prep)
+    return prepared[col]
+
+
+def _take(prep, pos):
+    text, numbers = prep
+    return text[pos], (numbers[pos] if numbers is not None else None)
+
+
+def _diff_rows(hits: dict, rows, cols, src_label: str, tgt_label: str) -> list:
+    """
+    依 (src 列位置, 欄位序號) 逐一產生長格式差異列：
+    欄位序號為 NO_KEY / SURPLUS_DUP 時是 Key 不存在 / 重複 Key 多出，其餘為該欄位的差異；
+    不論方向，值欄一律依 (A值, B值) 排列，與寬格式一致
+    """
+    keys = hits["keys"]
+    tgt_of = hits["tgt_of"]
+    texts = hits["texts"]
+    compare_cols = hits["compare_cols"]
+    direction = f"{src_label}→{tgt_label}"
+    tails = {
+        NO_KEY: [f"存在於{src_label}", f"不存在於{tgt_label}"],
+        SURPLUS_DUP: [f"存在於{src_label}", SURPLUS_DUP_TEXT.format(tgt_label)],
+    }
+    if src_label != "A":
+        tails = {j: pair[::-1] for j, pair in tails.items()}
+    tails[NO_KEY] = [DIFF_NO_KEY] + tails[NO_KEY] + [direction]
+    tails[SURPLUS_DUP] = [DIFF_SURPLUS_DUP] + tails[SURPLUS_DUP] + [direction]
+
+    out = []
+    for r, j in zip(rows, cols):
+        if j < 0:
+            out.append(list(keys[r]) + tails[j])
+            continue
+        src_text, tgt_text = texts[j]
+        src_disp = src_text[r]
+        tgt_disp = tgt_text[tgt_of[r]]
+        if src_label == "A":
+            out.append(list(keys[r]) + [compare_cols[j], src_disp, tgt_disp, direction])
+        else:
+            out.append(list(keys[r]) + [compare_cols[j], tgt_disp, src_disp, direction])
+    return out
+
+
 def diff_directional(
     df_src: pd.DataFrame,
     df_tgt: pd.DataFrame,
@@ -120,61 +456,268 @@ def diff_directional(
     map_tgt: dict,
     key_cols_src: list[int],
     src_label: str,  # "A" or "B"
-    tgt_label: str   # "B" or "A"
+    tgt_label: str,  # "B" or "A"
+    rules: dict | None = None,
+    join: str = JOIN_HASH,
+    keys_src: list[tuple] | None = None,
+    order_src: list[tuple] | None = None,
+    order_tgt: list[tuple] | None = None,
+    prepared_src: dict | None = None,
+    prepared_tgt: dict | None = None,
 ):
     """
     從 src 角度比對到 tgt：
     - Key 不存在 → 一筆差異
-    - Key 存在 → 逐欄位嚴格比對
+    - 重複 Key 多出（merge 時 src 同 key 的列比 tgt 多）→ 多出的每列一筆差異
+    - Key 存在 → 逐欄位比對（預設嚴格，rules 為 compile_rules 的結果）
+    - join：JOIN_HASH（重複 key 對第一筆）或 JOIN_MERGE（已排序輸入，重複 key 依組內順序對齊）
+    - keys_src / order_src / order_tgt / prepared_src / prepared_tgt：
+      先算好的 key 與欄位字串（見 _directional_hits），可省略
+
+    各欄位整欄一次比對完，最後依「列順序 → 欄位順序」輸出，
+    結果與逐列逐欄比對相同
     """
+    hits = _directional_hits(
+        df_src, df_tgt, map_tgt, key_cols_src, rules, join,
+        keys_src, order_src, order_tgt, prepared_src, prepared_tgt,
+    )
 
-    common_cols = [c for c in df_src.columns if c in df_tgt.columns]
-    key_names = [df_src.columns[i] for i in key_cols_src]
-    compare_cols = [c for c in common_cols if c not in key_names]
+    missing_pos = hits["missing_pos"]
+    surplus_pos = hits["surplus_pos"]
+    all_rows = np.concatenate([missing_pos, surplus_pos] + hits["col_hits"])
+    all_cols = np.concatenate(
+        [np.full(len(missing_pos), NO_KEY), np.full(len(surplus_pos), SURPLUS_DUP)]
+        + [np.full(len(h), j) for j, h in enumerate(hits["col_hits"])]
+    )
+    order = np.lexsort((all_cols, all_rows))
+    rows = _diff_rows(hits, all_rows[order].tolist(), all_cols[order].tolist(), src_label, tgt_label)
 
-    rows = []
-    missing_keys = []
-    matched_keys = 0
-    diff_count = 0
-
-    for _, row_src in df_src.iterrows():
-        key_t = make_key_tuple(row_src, key_cols_src)
-        key_out = list(key_t)
-
-        # Key 不存在
-        if key_t not in map_tgt:
-            missing_keys.append(key_t)
-            rows.append(
-                key_out + [
-                    "(Key不存在)",
-                    f"存在於{src_label}",
-                    f"不存在於{tgt_label}",
-                    f"{src_label}→{tgt_label}"
-                ]
-            )
-            diff_count += 1
+    missing_keys = [hits["keys"][i] for i in missing_pos]
+    return rows, missing_keys, hits["matched_keys"], len(rows)
+
+
+# =========================
+# Wide layout（逐 Key 一列）
+# =========================
+
+def diff_directional_wide(
+    df_src: pd.DataFrame,
+    df_tgt: pd.DataFrame,
+    map_tgt: dict,
+    key_cols_src: list[int],
+    src_label: str,  # "A" or "B"
+    tgt_label: str,  # "B" or "A"
+    rules: dict | None = None,
+    join: str = JOIN_HASH,
+    columns: list | None = None,
+    keys_src: list[tuple] | None = None,
+    order_src: list[tuple] | None = None,
+    order_tgt: list[tuple] | None = None,
+    prepared_src: dict | None = None,
+    prepared_tgt: dict | None = None,
+) -> pd.DataFrame:
+    """
+    與 diff_directional 相同的比對，但直接輸出寬格式（不先產生長格式）：
+    - 每個有差異的 key 一列：KEY_n、狀態、變更欄位數、變更欄位（位元字串）
+    - 變更欄位：依 columns 順序（預設 src 的比對欄位順序），有變更為 1、沒有為 0
+    - 只有「至少一列有變更」的欄位才會有 <欄位>_A / <欄位>_B，該列沒變更的留空
+    """
+    hits = _directional_hits(
+        df_src, df_tgt, map_tgt, key_cols_src, rules, join,
+        keys_src, order_src, order_tgt, prepared_src, prepared_tgt,
+    )
+    keys = hits["keys"]
+    tgt_of = hits["tgt_of"]
+    order_cols = list(columns) if columns is not None else hits["compare_cols"]
+    col_j = {c: j for j, c in enumerate(hits["compare_cols"])}
+
+    missing_pos = hits["missing_pos"]
+    surplus_pos = hits["surplus_pos"]
+    rows = np.unique(np.concatenate([missing_pos, surplus_pos] + hits["col_hits"]))
+    n = len(rows)
+
+    key_headers = [f"KEY_{i+1}" for i in range(len(key_cols_src))]
+    if n:
+        out = pd.DataFrame([keys[r] for r in rows.tolist()], columns=key_headers)
+    else:
+        out = pd.DataFrame(columns=key_headers)
+
+    status = np.full(n, "欄位差異", dtype=object)
+    status[np.searchsorted(rows, missing_pos)] = f"Key不存在於{tgt_label}"
+    status[np.searchsorted(rows, surplus_pos)] = SURPLUS_DUP_TEXT.format(tgt_label)
+    out["狀態"] = status
+
+    # 變更欄位位元圖：n × 欄位數 的 0/1，整批轉成字串
+    bitmap = np.zeros((n, len(order_cols)), dtype=np.uint8)
+    value_cols = {}
+    for k, col in enumerate(order_cols):
+        j = col_j.get(col)
+        if j is None or not len(hits["col_hits"][j]):
             continue
+        at = np.searchsorted(rows, hits["col_hits"][j])
+        bitmap[at, k] = 1
+
+        src_text, tgt_text = hits["texts"][j]
+        src_vals = np.full(n, "", dtype=object)
+        tgt_vals = np.full(n, "", dtype=object)
+        src_vals[at] = src_text[hits["col_hits"][j]]
+        tgt_vals[at] = tgt_text[tgt_of[hits["col_hits"][j]]]
+        a_vals, b_vals = (src_vals, tgt_vals) if src_label == "A" else (tgt_vals, src_vals)
+        value_cols[f"{col}_A"] = a_vals
+        value_cols[f"{col}_B"] = b_vals
+
+    out["變更欄位數"] = bitmap.sum(axis=1).astype(int)
+    if order_cols:
+        chars = (bitmap + ord("0")).view(f"S{len(order_cols)}").ravel()
+        out["變更欄位"] = np.char.decode(chars, "ascii").astype(object)
+    else:
+        out["變更欄位"] = ""
+
+    if value_cols:
+        out = pd.concat([out, pd.DataFrame(value_cols)], axis=1)
+    out["差異來源"] = f"{src_label}→{tgt_label}"
+    return out
 
-        matched_keys += 1
-        tgt_idx = map_tgt[key_t][0]
-        row_tgt = df_tgt.loc[tgt_idx]
-
-        for col in compare_cols:
-            a_val = row_src[col]
-            b_val = row_tgt[col]
-
-            if not values_equal_strict(a_val, b_val):
-                a_disp = normalize_raw_value(a_val)
-                b_disp = normalize_raw_value(b_val)
-
-                rows.append(
-                    key_out + [
-                        col,
-                        a_disp if src_label == "A" else b_disp,
-                        b_disp if src_label == "A" else a_disp,
-                        f"{src_label}→{tgt_label}"
-                    ]
-                )
-                diff_count += 1
-
-    return rows, missing_keys, matched_keys, diff_count
+
+# =========================
+# Summary-only counting
+# =========================
+
+def count_directional(
+    df_src: pd.DataFrame,
+    df_tgt: pd.DataFrame,
+    map_tgt: dict,
+    key_cols_src: list[int],
+    src_label: str,  # "A" or "B"
+    tgt_label: str,  # "B" or "A"
+    rules: dict | None = None,
+    max_examples: int = 0,
+    join: str = JOIN_HASH,
+    keys_src: list[tuple] | None = None,
+    order_src: list[tuple] | None = None,
+    order_tgt: list[tuple] | None = None,
+    prepared_src: dict | None = None,
+    prepared_tgt: dict | None = None,
+) -> dict:
+    """
+    與 diff_directional 相同的比對，但只統計、不產生差異列：
+    - column_counts：{欄位: 差異筆數}
+    - missing_keys：Key 不存在於 tgt 的列數
+    - surplus_dups：重複 Key 多出、tgt 沒有對應列的列數
+    - matched_keys：有對到的列數
+    - examples：{欄位: 前 max_examples 筆差異列}
+      （Key 不存在放在 "(Key不存在)"，重複 Key 多出放在 "(重複Key多出)"）
+    """
+    hits = _directional_hits(
+        df_src, df_tgt, map_tgt, key_cols_src, rules, join,
+        keys_src, order_src, order_tgt, prepared_src, prepared_tgt,
+    )
+
+    examples = {}
+    if max_examples > 0:
+        for label, code, pos in (
+            (DIFF_NO_KEY, NO_KEY, hits["missing_pos"]),
+            (DIFF_SURPLUS_DUP, SURPLUS_DUP, hits["surplus_pos"]),
+        ):
+            first = pos[:max_examples].tolist()
+            if first:
+                examples[label] = _diff_rows(hits, first, [code] * len(first), src_label, tgt_label)
+        for j, col in enumerate(hits["compare_cols"]):
+            first = hits["col_hits"][j][:max_examples].tolist()
+            if first:
+                examples[col] = _diff_rows(hits, first, [j] * len(first), src_label, tgt_label)
+
+    return {
+        "column_counts": {
+            col: len(h) for col, h in zip(hits["compare_cols"], hits["col_hits"])
+        },
+        "missing_keys": len(hits["missing_pos"]),
+        "surplus_dups": len(hits["surplus_pos"]),
+        "matched_keys": hits["matched_keys"],
+        "examples": examples,
+    }
+
+
+def summarize_compare(
+    df_a: pd.DataFrame,
+    df_b: pd.DataFrame,
+    key_cols_a: list[int],
+    key_cols_b: list[int],
+    rules: dict | None = None,
+    max_examples: int = 0,
+    join: str = JOIN_HASH,
+    order_a: list[tuple] | None = None,
+    order_b: list[tuple] | None = None,
+):
+    """
+    只統計模式（健康檢查用）：雙向比對但不產生差異明細，
+    order_a / order_b：判斷對齊方式時已算好的 key_order_pair（可省略），回傳
+    - df_counts：各欄位 A→B / B→A 差異筆數（含 "(Key不存在)"、"(重複Key多出)"）
+    - df_examples：每個欄位最多 max_examples 筆範例（長格式，同 A_to_B）
+    - stats：Key 不存在、重複 Key、重複 Key 多出、對到的列數
+    """
+    # 每一邊的 key 只建一次，兩個方向共用
+    keys_a = key_tuples(df_a, key_cols_a)
+    keys_b = key_tuples(df_b, key_cols_b)
+    if join == JOIN_MERGE:
+        map_a = map_b = None
+        if order_a is None or order_b is None:
+            order_a, order_b = key_order_pair(df_a, df_b, key_cols_a, key_cols_b)
+        dup_a = count_duplicates_sorted(order_a)
+        dup_b = count_duplicates_sorted(order_b)
+    else:
+        map_a = build_key_map(df_a, key_cols_a, keys_a)
+        map_b = build_key_map(df_b, key_cols_b, keys_b)
+        dup_a = count_duplicates_in_map(map_a)
+        dup_b = count_duplicates_in_map(map_b)
+
+    # 各欄位的字串與規則轉換也是每一邊只做一次
+    prepared_a, prepared_b = {}, {}
+    a_res = count_directional(
+        df_a, df_b, map_b, key_cols_a, "A", "B", rules, max_examples, join,
+        keys_a, order_a, order_b, prepared_a, prepared_b,
+    )
+    b_res = count_directional(
+        df_b, df_a, map_a, key_cols_b, "B", "A", rules, max_examples, join,
+        keys_b, order_b, order_a, prepared_b, prepared_a,
+    )
+
+    # 重複 Key 多出只有排序合併才會發生
+    special = [DIFF_NO_KEY, DIFF_SURPLUS_DUP] if join == JOIN_MERGE else [DIFF_NO_KEY]
+    cols = special + list(a_res["column_counts"])
+    a_counts = {
+        DIFF_NO_KEY: a_res["missing_keys"],
+        DIFF_SURPLUS_DUP: a_res["surplus_dups"],
+        **a_res["column_counts"],
+    }
+    b_counts = {
+        DIFF_NO_KEY: b_res["missing_keys"],
+        DIFF_SURPLUS_DUP: b_res["surplus_dups"],
+        **b_res["column_counts"],
+    }
+    df_counts = pd.DataFrame({
+        "差異欄位": cols,
+        "A→B": [a_counts.get(c, 0) for c in cols],
+        "B→A": [b_counts.get(c, 0) for c in cols],
+    })
+    df_counts["合計"] = df_counts["A→B"] + df_counts["B→A"]
+
+    key_headers = [f"KEY_{i+1}" for i in range(len(key_cols_a))]
+    headers = key_headers + ["差異欄位", "A值", "B值", "差異來源"]
+    example_rows = []
+    for col in cols:
+        example_rows += a_res["examples"].get(col, [])
+        example_rows += b_res["examples"].get(col, [])
+    df_examples = pd.DataFrame(example_rows, columns=headers)
+
+    stats = {
+        "missing_in_b": a_res["missing_keys"],
+        "missing_in_a": b_res["missing_keys"],
+        "surplus_a": a_res["surplus_dups"],
+        "surplus_b": b_res["surplus_dups"],
+        "matched_a": a_res["matched_keys"],
+        "matched_b": b_res["matched_keys"],
+        "dup_a": dup_a,
+        "dup_b": dup_b,
+    }
+    return df_counts, df_examples, stats
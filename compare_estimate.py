@@ -0,0 +1,149 @@
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from compare_core import DIFF_NO_KEY, DIFF_SURPLUS_DUP, JOIN_HASH, key_text_columns, summarize_compare
+
+# =========================
+# 快速估計（抽樣比對）
+# =========================
+# 依 key 的雜湊值抽樣：同一個 key 在 A、B 兩邊一定同時被抽到或同時不抽，
+# 所以樣本內的「Key 不存在」判斷是準確的，只需放大回全體
+
+SAMPLE_TARGET_ROWS = 20_000
+HASH_BUCKETS = 10_000
+Z_95 = 1.96
+
+# 沒有歷史紀錄可校正時使用的預設值
+DEFAULT_WRITE_SECONDS_PER_ROW = 2e-5
+DEFAULT_BYTES_PER_ROW = 60
+
+
+def key_sample_mask(key_columns: list[pd.Series], fraction: float) -> np.ndarray:
+    """
+    key 雜湊值落在前 fraction 比例的列為 True（固定雜湊種子，每次結果相同）
+    key_columns：key_text_columns 的結果，兩邊同一個 key 會得到同一個雜湊值
+    """
+    n = len(key_columns[0]) if key_columns else 0
+    if fraction >= 1:
+        return np.ones(n, dtype=bool)
+    frame = pd.DataFrame({i: col.to_numpy() for i, col in enumerate(key_columns)})
+    h = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return (h % HASH_BUCKETS) < int(round(fraction * HASH_BUCKETS))
+
+
+def wilson_interval(hits: int, n: int, z: float = Z_95):
+    """
+    比例的 Wilson 信賴區間（樣本小或比例接近 0 時也穩定）
+    """
+    if n <= 0:
+        return 0.0, 0.0, 1.0
+    p = hits / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return p, max(0.0, center - half), min(1.0, center + half)
+
+
+def estimate_compare(
+    df_a: pd.DataFrame,
+    df_b: pd.DataFrame,
+    key_cols_a: list[int],
+    key_cols_b: list[int],
+    rules: dict | None = None,
+    join: str = JOIN_HASH,
+    target_rows: int = SAMPLE_TARGET_ROWS,
+    write_seconds_per_row: float | None = None,
+    bytes_per_row: float | None = None,
+):
+    """
+    抽樣比對後推估完整比對的結果，回傳
+    - df_estimate：Key 不存在列數 / 差異列數 / 耗時 / 檔案大小（估計值 + 95% 上下限）
+    - df_columns：各欄位變更率與推估筆數（A→B）
+    - info：抽樣比例、樣本列數、抽樣比對耗時
+    """
+    write_seconds_per_row = write_seconds_per_row or DEFAULT_WRITE_SECONDS_PER_ROW
+    bytes_per_row = bytes_per_row or DEFAULT_BYTES_PER_ROW
+
+    n_a, n_b = len(df_a), len(df_b)
+    fraction = min(1.0, target_rows / max(n_a, n_b, 1))
+
+    t0 = time.perf_counter()
+    mask_a = key_sample_mask(key_text_columns(df_a, key_cols_a), fraction)
+    mask_b = key_sample_mask(key_text_columns(df_b, key_cols_b), fraction)
+    sample_a = df_a[mask_a]
+    sample_b = df_b[mask_b]
+    key_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df_counts, _, stats = summarize_compare(
+        sample_a, sample_b, key_cols_a, key_cols_b, rules=rules, join=join
+    )
+    diff_seconds = time.perf_counter() - t0
+
+    s_a, s_b = len(sample_a), len(sample_b)
+
+    def scaled(hits, n, total):
+        p, lo, hi = wilson_interval(hits, n)
+        if fraction >= 1:
+            # 沒有抽樣（資料量小於樣本數），結果就是實際值
+            lo = hi = p
+        return p, p * total, lo * total, hi * total
+
+    rows = []
+    _, miss_b, miss_b_lo, miss_b_hi = scaled(stats["missing_in_b"], s_a, n_a)
+    _, miss_a, miss_a_lo, miss_a_hi = scaled(stats["missing_in_a"], s_b, n_b)
+    rows.append(["A 有、B 無的 Key 列數", miss_b, miss_b_lo, miss_b_hi])
+    rows.append(["B 有、A 無的 Key 列數", miss_a, miss_a_lo, miss_a_hi])
+    est_ab = [miss_b, miss_b_lo, miss_b_hi]
+    est_ba = [miss_a, miss_a_lo, miss_a_hi]
+
+    # 重複 Key 多出（只有排序合併）：同一個 key 整組一起抽樣，一樣直接放大
+    if stats["surplus_a"] or stats["surplus_b"]:
+        _, sur_a, sur_a_lo, sur_a_hi = scaled(stats["surplus_a"], s_a, n_a)
+        _, sur_b, sur_b_lo, sur_b_hi = scaled(stats["surplus_b"], s_b, n_b)
+        rows.append(["A 重複 Key 多出列數（B 無對應列）", sur_a, sur_a_lo, sur_a_hi])
+        rows.append(["B 重複 Key 多出列數（A 無對應列）", sur_b, sur_b_lo, sur_b_hi])
+        est_ab = [x + y for x, y in zip(est_ab, (sur_a, sur_a_lo, sur_a_hi))]
+        est_ba = [x + y for x, y in zip(est_ba, (sur_b, sur_b_lo, sur_b_hi))]
+
+    # 差異列數：每個欄位各自推估後加總（上下限取各欄位上下限的和，偏保守）
+    col_rows = []
+    for _, r in df_counts.iterrows():
+        if r["差異欄位"] in (DIFF_NO_KEY, DIFF_SURPLUS_DUP):
+            continue
+        p, est, lo, hi = scaled(int(r["A→B"]), s_a, n_a)
+        col_rows.append([r["差異欄位"], p, est, lo, hi])
+        est_ab = [x + y for x, y in zip(est_ab, (est, lo, hi))]
+        _, est_b, lo_b, hi_b = scaled(int(r["B→A"]), s_b, n_b)
+        est_ba = [x + y for x, y in zip(est_ba, (est_b, lo_b, hi_b))]
+
+    rows.append(["A → B 差異列數", *est_ab])
+    rows.append(["B → A 差異列數", *est_ba])
+
+    result_rows = [a + b for a, b in zip(est_ab, est_ba)]
+    rows.append(["結果總列數", *result_rows])
+
+    # 耗時：key 處理依全體實測，比對依抽樣比例線性放大，寫檔依結果列數
+    scale = max(n_a + n_b, 1) / max(s_a + s_b, 1)
+    base_seconds = key_seconds + diff_seconds * scale
+    rows.append(["預估比對耗時（秒）", *[base_seconds + n * write_seconds_per_row for n in result_rows]])
+    rows.append(["預估結果檔大小（MB）", *[n * bytes_per_row / (1 << 20) for n in result_rows]])
+
+    df_estimate = pd.DataFrame(rows, columns=["項目", "估計值", "下限", "上限"])
+    df_estimate[["估計值", "下限", "上限"]] = df_estimate[["估計值", "下限", "上限"]].round(2)
+
+    df_columns = pd.DataFrame(col_rows, columns=["差異欄位", "A→B 變更率", "估計筆數", "下限", "上限"])
+    df_columns = df_columns.sort_values("估計筆數", ascending=False).round(
+        {"A→B 變更率": 4, "估計筆數": 0, "下限": 0, "上限": 0}
+    )
+
+    info = {
+        "fraction": fraction,
+        "sample_rows_a": s_a,
+        "sample_rows_b": s_b,
+        "sample_seconds": round(key_seconds + diff_seconds, 3),
+    }
+    return df_estimate, df_columns.reset_index(drop=True), info
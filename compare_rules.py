@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# 比對規則（逐欄位正規化）
+# =========================
+# 規則寫法：{欄位: [步驟, ...]}
+# - "trim"          去前後空白
+# - "ignore_case"   不分大小寫
+# - "date"          日期格式不拘（能解析成日期的，以日期值比對）
+# - "numeric"       數值比對，容差 0；("numeric", 0.01) 指定容差
+# 沒列到的欄位一律嚴格比對（與 values_equal_strict 相同）
+
+RULE_TRIM = "trim"
+RULE_IGNORE_CASE = "ignore_case"
+RULE_DATE = "date"
+RULE_NUMERIC = "numeric"
+
+RULE_LABELS = {
+    RULE_TRIM: "去前後空白",
+    RULE_IGNORE_CASE: "不分大小寫",
+    RULE_DATE: "日期格式不拘",
+    RULE_NUMERIC: "數值容差",
+}
+
+DATE_CANONICAL_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _trim(text: pd.Series) -> pd.Series:
+    return text.str.strip()
+
+
+def _ignore_case(text: pd.Series) -> pd.Series:
+    return text.str.casefold()
+
+
+def _canonical_date(text: pd.Series) -> pd.Series:
+    """
+    能解析成日期的值轉成同一種格式，解析不了的保留原字串；
+    同一欄有帶時區和不帶時區的值混在一起時，全部換算成 UTC（不帶時區的視為 UTC）
+    """
+    values = text.where(text != "")
+    try:
+        parsed = pd.to_datetime(values, errors="coerce", format="mixed")
+    except ValueError:
+        # Mixed timezones detected
+        parsed = pd.to_datetime(values, errors="coerce", format="mixed", utc=True)
+    return parsed.dt.strftime(DATE_CANONICAL_FORMAT).where(parsed.notna(), text)
+
+
+_TEXT_STEPS = {
+    RULE_TRIM: _trim,
+    RULE_IGNORE_CASE: _ignore_case,
+    RULE_DATE: _canonical_date,
+}
+
+
+class CompiledRule:
+    """
+    單一欄位編譯後的比對規則：
+    - prepare：整欄一次做完所有文字轉換（+ 數值解析）
+    - equal：兩邊整批比對，回傳 bool 陣列
+    """
+
+    def __init__(self, text_steps=(), tolerance=None):
+        self.text_steps = list(text_steps)
+        self.tolerance = tolerance
+
+    @property
+    def is_strict(self) -> bool:
+        return not self.text_steps and self.tolerance is None
+
+    def prepare(self, text: pd.Series):
+        """
+        text：嚴格模式的顯示字串（NaN 已轉空字串）
+        """
+        for step in self.text_steps:
+            text = step(text)
+        numbers = None
+        if self.tolerance is not None:
+            numbers = pd.to_numeric(text.str.strip(), errors="coerce").to_numpy(dtype="float64")
+        return text.to_numpy(dtype=object), numbers
+
+    def equal(self, prep_a, prep_b) -> np.ndarray:
+        text_a, num_a = prep_a
+        text_b, num_b = prep_b
+        same = text_a == text_b
+        if self.tolerance is not None:
+            both = ~np.isnan(num_a) & ~np.isnan(num_b)
+            # 先比相等（inf 對 inf 相減會是 NaN），其餘才看差距
+            close = num_a == num_b
+            finite = both & ~close & np.isfinite(num_a) & np.isfinite(num_b)
+            close[finite] = np.abs(num_a[finite] - num_b[finite]) <= self.tolerance
+            same = np.where(both, close, same)
+        return np.asarray(same, dtype=bool)
+
+
+STRICT_RULE = CompiledRule()
+
+
+def _split_step(step):
+    """
+    "trim" / ("numeric", 0.01) / ("numeric",) → (名稱, 參數或 None)
+    """
+    if isinstance(step, (tuple, list)):
+        return step[0], (step[1] if len(step) > 1 else None)
+    return step, None
+
+
+def _tolerance(arg) -> float:
+    """
+    數值容差：沒給（None）視為 0
+    """
+    return abs(float(arg or 0))
+
+
+def compile_rules(spec: dict | None) -> dict:
+    """
+    把規則寫法編譯成 {欄位: CompiledRule}，比對前做一次即可
+    """
+    compiled = {}
+    for col, steps in (spec or {}).items():
+        text_steps = []
+        tolerance = None
+        for step in steps:
+            name, arg = _split_step(step)
+            if name == RULE_NUMERIC:
+                tolerance = _tolerance(arg)
+            elif name in _TEXT_STEPS:
+                text_steps.append(_TEXT_STEPS[name])
+            else:
+                raise ValueError(f"未知的比對規則：{name}")
+        rule = CompiledRule(text_steps, tolerance)
+        if not rule.is_strict:
+            compiled[col] = rule
+    return compiled
+
+
+def describe_rules(spec: dict | None) -> str:
+    """
+    規則寫法轉成一行說明（寫進 Summary 用）
+    """
+    if not spec:
+        return "嚴格比對"
+    parts = []
+    for col, steps in spec.items():
+        labels = []
+        for step in steps:
+            name, arg = _split_step(step)
+            label = RULE_LABELS.get(name, name)
+            if name == RULE_NUMERIC:
+                label = f"{label}={_tolerance(arg):g}"
+            labels.append(label)
+        parts.append(f"{col}：{'、'.join(labels)}")
+    return "；".join(parts)
@@ -0,0 +1,176 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from compare_core import (
+    clean_header_name,
+    default_key_columns,
+    key_tuples,
+    build_key_map,
+    count_duplicates_in_map,
+    diff_directional,
+)
+
+# =========================
+# 多工作表比對
+# =========================
+
+SHEET_COL = "工作表"
+DIFF_TAIL_HEADERS = ["差異欄位", "A值", "B值", "差異來源"]
+
+
+def pair_sheets(names_a, names_b):
+    """
+    依工作表名稱配對：
+    - 先找名稱完全相同的
+    - 剩下的再用 clean_header_name（去空白、不分大小寫）配對
+    回傳 (pairs, only_a, only_b)，pairs 為 [(A 名稱, B 名稱), ...]
+    """
+    names_a = list(names_a)
+    names_b = list(names_b)
+    set_a = set(names_a)
+    rest_b = [n for n in names_b if n not in set_a]
+
+    pairs = []
+    only_a = []
+    cleaned_b = {}
+    for n in rest_b:
+        cleaned_b.setdefault(clean_header_name(n), n)
+
+    for n in names_a:
+        if n in names_b:
+            pairs.append((n, n))
+            continue
+        match = cleaned_b.pop(clean_header_name(n), None)
+        if match is None:
+            only_a.append(n)
+        else:
+            pairs.append((n, match))
+
+    paired_b = {b for _, b in pairs}
+    only_b = [n for n in names_b if n not in paired_b]
+    return pairs, only_a, only_b
+
+
+def compare_sheet_pair(sheet_a: str, sheet_b: str, df_a: pd.DataFrame, df_b: pd.DataFrame, rules: dict | None = None) -> dict:
+    """
+    比對一組工作表（Key 依該工作表表頭用預設規則決定）
+    """
+    t0 = time.perf_counter()
+    out = {
+        "sheet": sheet_a if sheet_a == sheet_b else f"{sheet_a} / {sheet_b}",
+        "status": "OK",
+        "keys": [],
+        "rows_a": len(df_a),
+        "rows_b": len(df_b),
+        "dup_a": 0,
+        "dup_b": 0,
+        "a_rows": [],
+        "b_rows": [],
+        "seconds": 0.0,
+    }
+
+    keys = default_key_columns(df_a.columns)
+    out["keys"] = keys
+    missing = [k for k in keys if k not in df_b.columns]
+    if not keys:
+        out["status"] = "空白工作表"
+    elif missing:
+        out["status"] = f"B 缺少 Key 欄位：{', '.join(map(str, missing))}"
+    else:
+        key_cols_a = [df_a.columns.get_loc(k) for k in keys]
+        key_cols_b = [df_b.columns.get_loc(k) for k in keys]
+
+        keys_a = key_tuples(df_a, key_cols_a)
+        keys_b = key_tuples(df_b, key_cols_b)
+        map_a = build_key_map(df_a, key_cols_a, keys_a)
+        map_b = build_key_map(df_b, key_cols_b, keys_b)
+
+        out["dup_a"] = count_duplicates_in_map(map_a)
+        out["dup_b"] = count_duplicates_in_map(map_b)
+
+        prepared_a, prepared_b = {}, {}
+        out["a_rows"], _, _, _ = diff_directional(
+            df_a, df_b, map_a, map_b, key_cols_a, "A", "B", rules=rules,
+            keys_src=keys_a, prepared_src=prepared_a, prepared_tgt=prepared_b,
+        )
+        out["b_rows"], _, _, _ = diff_directional(
+            df_b, df_a, map_b, map_a, key_cols_b, "B", "A", rules=rules,
+            keys_src=keys_b, prepared_src=prepared_b, prepared_tgt=prepared_a,
+        )
+
+    out["seconds"] = round(time.perf_counter() - t0, 3)
+    return out
+
+
+def _combined_frame(results: list[dict], rows_field: str, key_width: int) -> pd.DataFrame:
+    """
+    把各工作表的差異列合成一張表：工作表 + KEY_1..KEY_n（不足補空白）+ 差異欄位等
+    """
+    key_headers = [f"KEY_{i+1}" for i in range(key_width)]
+    headers = [SHEET_COL] + key_headers + DIFF_TAIL_HEADERS
+
+    rows = []
+    for r in results:
+        pad = [""] * (key_width - len(r["keys"]))
+        n_keys = len(r["keys"])
+        for row in r[rows_field]:
+            rows.append([r["sheet"]] + row[:n_keys] + pad + row[n_keys:])
+
+    return pd.DataFrame(rows, columns=headers)
+
+
+def compare_workbooks(sheets_a: dict, sheets_b: dict, max_workers: int = 4, rules: dict | None = None):
+    """
+    sheets_a / sheets_b：pd.read_excel(..., sheet_name=None) 的結果
+    rules：compile_rules 的結果，依欄位名稱套用到每個工作表
+    各組工作表丟到子行程同時比對（比對大多是 Python 迴圈，執行緒會被 GIL 卡住），
+    子行程數不超過 CPU 核心數；只有一組或只能用一個行程時直接在本行程比對，回傳
+    (df_summary, df_a_to_b, df_b_to_a)
+    """
+    pairs, only_a, only_b = pair_sheets(sheets_a.keys(), sheets_b.keys())
+
+    workers = min(max_workers, len(pairs), os.cpu_count() or 1)
+    if workers <= 1:
+        results = [compare_sheet_pair(a, b, sheets_a[a], sheets_b[b], rules) for a, b in pairs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(compare_sheet_pair, a, b, sheets_a[a], sheets_b[b], rules)
+                for a, b in pairs
+            ]
+            results = [f.result() for f in futures]
+
+    summary_cols = [
+        SHEET_COL, "狀態", "Key 欄位", "A 列數", "B 列數",
+        "A 重複 Key 列數", "B 重複 Key 列數",
+        "A → B 差異列數", "B → A 差異列數", "耗時(秒)",
+    ]
+    summary_rows = []
+    for r in results:
+        summary_rows.append([
+            r["sheet"],
+            r["status"],
+            ", ".join(map(str, r["keys"])),
+            r["rows_a"],
+            r["rows_b"],
+            r["dup_a"],
+            r["dup_b"],
+            len(r["a_rows"]),
+            len(r["b_rows"]),
+            r["seconds"],
+        ])
+    for n in only_a:
+        summary_rows.append([n, "B 缺少此工作表", "", len(sheets_a[n]), "", "", "", "", "", ""])
+    for n in only_b:
+        summary_rows.append([n, "A 缺少此工作表", "", "", len(sheets_b[n]), "", "", "", "", ""])
+
+    df_summary = pd.DataFrame(summary_rows, columns=summary_cols)
+
+    key_width = max([len(r["keys"]) for r in results] + [1])
+    df_a_to_b = _combined_frame(results, "a_rows", key_width)
+    df_b_to_a = _combined_frame(results, "b_rows", key_width)
+
+    return df_summary, df_a_to_b, df_b_to_a
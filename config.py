@@ -7,3 +7,6 @@ APP_FOOTER = "© 2025 Roger＆Andy with GPT ｜ QQ資料製作小組 ｜"
 # 之後要擴充也很方便
 SESSION_TIMEOUT_SECONDS = 30 * 60
 WARNING_SECONDS = 5 * 60
+
+# 多工作表比對：同時比對的工作表數
+MULTI_SHEET_MAX_WORKERS = 4
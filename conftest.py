@@ -0,0 +1 @@
+# 讓 tests/ 可以直接 import 根目錄的模組（pytest 會把這個檔案所在目錄加進 sys.path）
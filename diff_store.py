@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# 差異結果（伺服器端精簡儲存）
+# =========================
+
+DIFF_COL = "差異欄位"
+SOURCE_COL = "差異來源"
+
+
+class DiffStore:
+    """
+    比對結果的精簡儲存（給頁面上的差異瀏覽器用）：
+    - A→B / B→A 合併成一張表
+    - Key / 差異欄位 / 差異來源 轉成 category，重複值只存一次
+    - 依差異欄位、差異來源、Key 前綴篩選後分頁取出
+    """
+
+    def __init__(self, df_a_to_b: pd.DataFrame, df_b_to_a: pd.DataFrame, key_headers: list[str]):
+        self.key_headers = list(key_headers)
+        self.headers = self.key_headers + [DIFF_COL, "A值", "B值", SOURCE_COL]
+
+        frames = [f[self.headers] for f in (df_a_to_b, df_b_to_a) if not f.empty]
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+        else:
+            df = pd.DataFrame(columns=self.headers)
+
+        for c in self.key_headers + [DIFF_COL, SOURCE_COL]:
+            df[c] = df[c].astype("category")
+
+        self._df = df
+        self._key_text = None
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    def memory_bytes(self) -> int:
+        """
+        結果在伺服器端佔用的記憶體（bytes，含字串本身）
+        """
+        return int(self._df.memory_usage(deep=True).sum())
+
+    @property
+    def diff_columns(self) -> list[str]:
+        return [str(c) for c in self._df[DIFF_COL].cat.categories]
+
+    @property
+    def sources(self) -> list[str]:
+        return [str(c) for c in self._df[SOURCE_COL].cat.categories]
+
+    def _key_series(self) -> pd.Series:
+        """
+        多 Key 以「|」串起來，第一次篩選 Key 前綴時才建立
+        """
+        if self._key_text is None:
+            parts = [self._df[c].astype(str) for c in self.key_headers]
+            text = parts[0]
+            for p in parts[1:]:
+                text = text + "|" + p
+            self._key_text = text.astype("category")
+        return self._key_text
+
+    def _category_mask(self, col: str, labels) -> np.ndarray:
+        """
+        依畫面上的文字（diff_columns / sources）篩選：
+        欄位名稱可能是數字（例如 2023），所以比對 category 的字串形式
+        """
+        series = self._df[col]
+        hit = series.cat.categories.astype(str).isin([str(v) for v in labels])
+        codes = series.cat.codes.to_numpy()
+        return (codes >= 0) & hit[codes]
+
+    def _mask(self, columns=None, sources=None, key_prefix: str = ""):
+        mask = pd.Series(True, index=self._df.index)
+        if columns:
+            mask &= self._category_mask(DIFF_COL, columns)
+        if sources:
+            mask &= self._category_mask(SOURCE_COL, sources)
+        if key_prefix:
+            keys = self._key_series()
+            # 只對 category 本身做 startswith，再用 codes 展開到每一列
+            hit = keys.cat.categories.str.startswith(key_prefix)
+            codes = keys.cat.codes.to_numpy()
+            mask &= (codes >= 0) & hit[codes]
+        return mask
+
+    def count(self, columns=None, sources=None, key_prefix: str = "") -> int:
+        return int(self._mask(columns, sources, key_prefix).sum())
+
+    def select(self, columns=None, sources=None, key_prefix: str = "") -> pd.DataFrame:
+        """
+        回傳篩選後的全部差異（匯出子集合用）
+        """
+        out = self._df[self._mask(columns, sources, key_prefix)]
+        return _as_plain(out)
+
+    def page(self, page: int, page_size: int, columns=None, sources=None, key_prefix: str = ""):
+        """
+        回傳 (該頁資料, 篩選後總筆數)，page 從 1 開始
+        """
+        idx = self._df.index[self._mask(columns, sources, key_prefix)]
+        total = len(idx)
+        start = max(page - 1, 0) * page_size
+        out = self._df.loc[idx[start:start + page_size]]
+        return _as_plain(out, text=True), total
+
+    def column_counts(self, columns=None, sources=None, key_prefix: str = "") -> pd.DataFrame:
+        """
+        各差異欄位的變更筆數（依差異來源拆開 + 合計），由多到少排序
+        """
+        df = self._df[self._mask(columns, sources, key_prefix)]
+        counts = (
+            df.groupby([DIFF_COL, SOURCE_COL], observed=True)
+            .size()
+            .unstack(SOURCE_COL, fill_value=0)
+        )
+        counts.columns = [str(c) for c in counts.columns]
+        counts = counts.reindex(columns=self.sources, fill_value=0)
+        counts["合計"] = counts.sum(axis=1)
+        counts = counts.sort_values("合計", ascending=False)
+        counts.index = counts.index.astype(str)
+        return counts.reset_index()
+
+
+def _as_plain(df: pd.DataFrame, text: bool = False) -> pd.DataFrame:
+    """
+    category 轉回一般欄位：
+    - 匯出保留原始值（數字欄位名稱仍是數字）
+    - text=True 時轉成字串，給畫面顯示使用
+    """
+    out = df.copy()
+    for c in out.columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(str if text else object)
+    return out.reset_index(drop=True)
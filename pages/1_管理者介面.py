@@ -6,6 +6,7 @@ import time
 from datetime import datetime
 
 from config import APP_NAME, APP_VERSION, APP_FOOTER
+from telemetry import AUXILIARY_MODES, load_records, latency_percentiles
 
 # =========================================================
 # Page config
@@ -20,6 +21,15 @@ st.set_page_config(
 # =========================================================
 ADMIN_TIMEOUT_SECONDS = 10 * 60
 
+# =========================================================
+# 各比對模式的 total_seconds 涵蓋哪些階段
+# =========================================================
+TOTAL_SECONDS_SCOPE = {
+    "full": "建 Key 對應 + 比對 + 建結果（不含產生 Excel，下載時另記 xlsx_download）",
+    "count_only": "判斷對齊方式 + 比對 + 產生 Excel",
+    "multi_sheet": "比對 + 產生 Excel",
+}
+
 # =========================================================
 # 🔐 管理者登入（含逾時）
 # =========================================================
@@ -77,6 +87,62 @@ with st.sidebar:
         st.session_state.admin_authenticated = False
         st.rerun()
 
+# =========================================================
+# ⏱️ 比對效能儀表板（每次比對追加一筆到 data/telemetry.jsonl）
+# =========================================================
+st.title("比對效能")
+
+df_perf = load_records()
+
+if df_perf.empty:
+    st.info("目前尚無比對效能紀錄")
+else:
+    modes = ["全部"] + sorted(df_perf["mode"].dropna().unique().tolist())
+    perf_mode = st.selectbox(
+        "比對模式", modes, key="perf_mode",
+        help="「全部」不含抽樣估計（estimate）與下載時產生 Excel（xlsx_download）的紀錄，分位數依模式分開列出",
+    )
+    if perf_mode != "全部":
+        df_perf = df_perf[df_perf["mode"] == perf_mode]
+        group = []
+    else:
+        df_perf = df_perf[~df_perf["mode"].isin(AUXILIARY_MODES)]
+        group = ["mode"]
+    st.caption("total_seconds 涵蓋範圍：" + "｜".join(f"{m}：{d}" for m, d in TOTAL_SECONDS_SCOPE.items()))
+
+    total_s = df_perf["total_seconds"]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("⏱️ 比對次數", len(df_perf))
+    m2.metric("p50（秒）", f"{total_s.quantile(0.5):.2f}" if len(total_s) else "-")
+    m3.metric("p95（秒）", f"{total_s.quantile(0.95):.2f}" if len(total_s) else "-")
+    m4.metric("p99（秒）", f"{total_s.quantile(0.99):.2f}" if len(total_s) else "-")
+
+    if len(df_perf):
+        st.subheader("耗時分位數｜依資料量（A + B 列數）")
+        st.dataframe(latency_percentiles(df_perf, group + ["size_bucket"]), use_container_width=True, hide_index=True)
+
+        st.subheader("耗時分位數｜依版本 × 資料量")
+        df_ver = latency_percentiles(df_perf, group + ["app_version", "size_bucket"])
+        st.dataframe(df_ver, use_container_width=True, hide_index=True)
+        st.caption("p95（秒）")
+        series = df_ver["app_version"].astype(str)
+        if group:
+            series = df_ver["mode"].astype(str) + "｜" + series
+        st.bar_chart(df_ver.assign(series=series).pivot(index="size_bucket", columns="series", values="p95"))
+
+        stage_cols = [c for c in df_perf.columns if c.startswith("stage_")]
+        if stage_cols:
+            st.subheader("各階段平均耗時（秒）｜依資料量")
+            df_stage = df_perf.groupby("size_bucket", observed=True)[stage_cols].mean().round(3)
+            df_stage.columns = [c.removeprefix("stage_") for c in stage_cols]
+            st.bar_chart(df_stage)
+
+        with st.expander("最近 50 筆紀錄"):
+            st.caption("process_peak_mem_mb 為伺服器行程啟動以來的最高記憶體（MB），不是單次比對的用量")
+            st.dataframe(df_perf.tail(50).iloc[::-1], use_container_width=True, hide_index=True)
+
+st.markdown("---")
+
 # =========================================================
 # 主畫面
 # =========================================================
@@ -0,0 +1,167 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource  # 只有 Unix 有
+except ImportError:
+    resource = None
+
+# =========================
+# 比對效能紀錄（append-only JSON Lines）
+# =========================
+
+TELEMETRY_FILE = Path("data") / "telemetry.jsonl"
+
+# 依 A + B 總列數分組
+SIZE_BUCKETS = [
+    (10_000, "< 1萬"),
+    (100_000, "1萬–10萬"),
+    (1_000_000, "10萬–100萬"),
+    (float("inf"), "≥ 100萬"),
+]
+SIZE_BUCKET_LABELS = [label for _, label in SIZE_BUCKETS]
+
+
+class StageTimer:
+    """
+    各階段耗時：
+        timer = StageTimer()
+        with timer.stage("diff"):
+            ...
+        timer.stages  # {"diff": 1.23}
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._t0 = time.perf_counter()
+        self._extra = 0.0
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        計時器啟動前就做完的階段（例如讀檔），直接補上耗時
+        """
+        self.stages[name] = round(seconds, 4)
+        self._extra += seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0.0) + time.perf_counter() - t0, 4)
+
+    @property
+    def total(self) -> float:
+        return round(time.perf_counter() - self._t0 + self._extra, 4)
+
+
+def process_peak_memory_mb():
+    """
+    整個行程啟動以來的最高記憶體用量（MB），不是單次比對的用量：
+    Streamlit 伺服器會一直跑，數值只會往上，適合看伺服器水位。
+    Windows 沒有 resource 模組時回傳 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss 單位：macOS 是 bytes，Linux 是 KB
+    if sys.platform == "darwin":
+        return round(peak / (1 << 20), 1)
+    return round(peak / 1024, 1)
+
+
+def append_record(record: dict, path: Path = TELEMETRY_FILE) -> None:
+    """
+    追加一筆紀錄（一行一筆 JSON，不改動既有內容）
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def load_records(path: Path = TELEMETRY_FILE) -> pd.DataFrame:
+    """
+    讀回所有紀錄；stages 展開成 stage_<名稱> 欄位，壞掉的行略過
+    """
+    if not path.exists():
+        return pd.DataFrame()
+
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            stages = rec.pop("stages", None) or {}
+            for name, sec in stages.items():
+                rec[f"stage_{name}"] = sec
+            rows.append(rec)
+
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    df["size_bucket"] = pd.Categorical(
+        [size_bucket(n) for n in df["rows_a"].fillna(0) + df["rows_b"].fillna(0)],
+        categories=SIZE_BUCKET_LABELS,
+        ordered=True,
+    )
+    return df
+
+
+def size_bucket(total_rows) -> str:
+    for upper, label in SIZE_BUCKETS:
+        if total_rows < upper:
+            return label
+    return SIZE_BUCKET_LABELS[-1]
+
+
+def latency_percentiles(df: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """
+    依 by 分組計算總耗時 p50 / p95 / p99（秒）與次數
+    """
+    g = df.groupby(by, observed=True)["total_seconds"]
+    out = g.quantile([0.5, 0.95, 0.99]).unstack()
+    out.columns = ["p50", "p95", "p99"]
+    out.insert(0, "次數", g.size())
+    return out.round(3).reset_index()
+
+
+# 不是一次完整比對的紀錄（抽樣估計、下載時才產生 Excel），「全部」的耗時統計不納入
+AUXILIARY_MODES = ("estimate", "xlsx_download")
+
+
+# 寫檔耗時 / 檔案大小對應的就是 result_rows 的紀錄（只統計模式的 result_rows 是範例數，不算）
+CALIBRATION_MODES = ("xlsx_download", "multi_sheet")
+
+
+def write_calibration(df: pd.DataFrame, min_rows: int = 1000) -> dict:
+    """
+    從歷史紀錄估算「每列結果的寫檔秒數」與「每列結果的檔案大小」（中位數），
+    只用 CALIBRATION_MODES 的紀錄；紀錄不足時回傳 None，由呼叫端用預設值
+    """
+    out = {"write_seconds_per_row": None, "bytes_per_row": None}
+    if df.empty or "result_rows" not in df.columns:
+        return out
+
+    df = df[df["mode"].isin(CALIBRATION_MODES)]
+    big = df[df["result_rows"].fillna(0) >= min_rows]
+    if "stage_xlsx" in big.columns:
+        sec = (big["stage_xlsx"] / big["result_rows"]).dropna()
+        if len(sec):
+            out["write_seconds_per_row"] = float(sec.median())
+    if "result_bytes" in big.columns:
+        size = (big["result_bytes"] / big["result_rows"]).dropna()
+        if len(size):
+            out["bytes_per_row"] = float(size.median())
+    return out
@@ -0,0 +1,332 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compare_core import (
+    JOIN_MERGE,
+    build_key_map,
+    count_duplicate_keys,
+    detect_join,
+    diff_directional,
+    diff_directional_wide,
+    JOIN_HASH,
+    key_order_pair,
+    make_key_tuple,
+    summarize_compare,
+    normalize_raw_value,
+    values_equal_strict,
+)
+from compare_rules import compile_rules, describe_rules
+
+
+# =========================
+# 逐列逐欄的參考實作（向量化之前的比對方式）
+# =========================
+
+def reference_key_map(df, key_cols):
+    key_map = {}
+    for idx, row in df.iterrows():
+        key_map.setdefault(make_key_tuple(row, key_cols), []).append(idx)
+    return key_map
+
+
+def reference_diff(df_src, df_tgt, map_tgt, key_cols_src, src_label, tgt_label):
+    key_names = [df_src.columns[i] for i in key_cols_src]
+    compare_cols = [c for c in df_src.columns if c in df_tgt.columns and c not in key_names]
+    direction = f"{src_label}→{tgt_label}"
+
+    rows = []
+    missing_keys = []
+    matched_keys = 0
+    for _, row_src in df_src.iterrows():
+        key_t = make_key_tuple(row_src, key_cols_src)
+        if key_t not in map_tgt:
+            missing_keys.append(key_t)
+            presence = [f"存在於{src_label}", f"不存在於{tgt_label}"]
+            if src_label != "A":
+                presence.reverse()
+            rows.append(list(key_t) + ["(Key不存在)"] + presence + [direction])
+            continue
+
+        matched_keys += 1
+        row_tgt = df_tgt.loc[map_tgt[key_t][0]]
+        for col in compare_cols:
+            if not values_equal_strict(row_src[col], row_tgt[col]):
+                a_disp = normalize_raw_value(row_src[col])
+                b_disp = normalize_raw_value(row_tgt[col])
+                rows.append(list(key_t) + [
+                    col,
+                    a_disp if src_label == "A" else b_disp,
+                    b_disp if src_label == "A" else a_disp,
+                    direction,
+                ])
+    return rows, missing_keys, matched_keys, len(rows)
+
+
+# =========================
+# 隨機混合型別資料
+# =========================
+
+def _cell(rng, kind):
+    r = rng.random()
+    if r < 0.1:
+        return None
+    if r < 0.15:
+        return np.nan
+    if kind == "str":
+        return rng.choice(["x", "y", " x", "X", "a b", "1", "1.0"])
+    if kind == "int":
+        return rng.randint(0, 3)
+    if kind == "float":
+        return rng.choice([0.1, 1.0, 2.5, 3.0])
+    if kind == "date":
+        return pd.Timestamp(f"2024-01-0{rng.randint(1, 3)}")
+    if kind == "bool":
+        return rng.choice([True, False])
+    return rng.choice(["x", 1, 2.5, pd.Timestamp("2024-01-01"), True])
+
+
+def _frame(rng, n, kinds, numeric_keys):
+    if numeric_keys:
+        data = {
+            "PLNNR": [rng.randint(0, n // 2) for _ in range(n)],
+            "VORNR": [rng.choice([10, 20]) for _ in range(n)],
+        }
+    else:
+        data = {
+            "PLNNR": [str(rng.randint(0, n // 2)) for _ in range(n)],
+            "VORNR": [rng.choice(["10", "20", " 30"]) for _ in range(n)],
+        }
+    for i, kind in enumerate(kinds):
+        data[f"C{i}_{kind}"] = [_cell(rng, kind) for _ in range(n)]
+    return pd.DataFrame(data)
+
+
+def _cases():
+    rng = random.Random(1)
+    for case in range(40):
+        numeric = case % 4 == 0
+        if numeric:
+            # 全數值表：逐列讀取時 int 會被轉成 float
+            kinds = ["int", "float"]
+        else:
+            kinds = rng.sample(["str", "int", "float", "date", "bool", "mixed"], k=4)
+        df_a = _frame(rng, 40, kinds, numeric)
+        df_b = _frame(rng, 40, kinds, numeric)
+        if numeric and case % 8 == 0:
+            df_a = df_a.dropna().astype({c: "int64" for c in df_a.columns if c.endswith("int")})
+        yield case, df_a, df_b
+
+
+@pytest.mark.parametrize("keys", [["PLNNR", "VORNR"], ["PLNNR"]])
+def test_strict_diff_matches_per_cell_reference(keys):
+    for case, df_a, df_b in _cases():
+        key_cols_a = [df_a.columns.get_loc(k) for k in keys]
+        key_cols_b = [df_b.columns.get_loc(k) for k in keys]
+
+        map_a = build_key_map(df_a, key_cols_a)
+        map_b = build_key_map(df_b, key_cols_b)
+        assert map_a == reference_key_map(df_a, key_cols_a), case
+        assert map_b == reference_key_map(df_b, key_cols_b), case
+        assert count_duplicate_keys(df_a, key_cols_a) == sum(len(v) - 1 for v in map_a.values())
+
+        for src, tgt, m_src, m_tgt, k_src, labels in (
+            (df_a, df_b, map_a, map_b, key_cols_a, ("A", "B")),
+            (df_b, df_a, map_b, map_a, key_cols_b, ("B", "A")),
+        ):
+            expected = reference_diff(src, tgt, m_tgt, k_src, *labels)
+            assert diff_directional(src, tgt, m_src, m_tgt, k_src, *labels) == expected, case
+
+
+# =========================
+# 寬格式
+# =========================
+
+def test_wide_layout_bitmap_status_and_values():
+    df_a = pd.DataFrame({"K": ["1", "2", "3"], "V": ["a", "b", "c"], "W": [1, 2, 3], "X": [0, 0, 0]})
+    df_b = pd.DataFrame({"K": ["1", "3", "4"], "V": ["a", "C", "d"], "W": [9, 3, 4], "X": [0, 0, 0]})
+    map_a = build_key_map(df_a, [0])
+    map_b = build_key_map(df_b, [0])
+
+    # 位元字串依 columns 的順序；沒有任何變更的欄位（X）不產生值欄
+    wide = diff_directional_wide(df_a, df_b, map_b, [0], "A", "B", columns=["X", "W", "V"])
+    assert wide.columns.tolist() == [
+        "KEY_1", "狀態", "變更欄位數", "變更欄位", "W_A", "W_B", "V_A", "V_B", "差異來源",
+    ]
+    assert wide.values.tolist() == [
+        ["1", "欄位差異", 1, "010", "1", "9", "", "", "A→B"],
+        ["2", "Key不存在於B", 0, "000", "", "", "", "", "A→B"],
+        ["3", "欄位差異", 1, "001", "", "", "c", "C", "A→B"],
+    ]
+
+    wide = diff_directional_wide(df_b, df_a, map_a, [0], "B", "A", columns=["X", "W", "V"])
+    assert wide.values.tolist() == [
+        ["1", "欄位差異", 1, "010", "1", "9", "", "", "B→A"],
+        ["3", "欄位差異", 1, "001", "", "", "c", "C", "B→A"],
+        ["4", "Key不存在於A", 0, "000", "", "", "", "", "B→A"],
+    ]
+
+
+def test_wide_layout_marks_surplus_duplicates():
+    df_a = pd.DataFrame({"K": [1, 1, 2], "V": ["a", "b", "c"]})
+    df_b = pd.DataFrame({"K": [1, 2], "V": ["a", "c"]})
+    wide = diff_directional_wide(df_a, df_b, None, [0], "A", "B", join=JOIN_MERGE)
+    assert wide[["KEY_1", "狀態", "變更欄位"]].values.tolist() == [["1", "重複Key多出一筆（B無對應列）", "0"]]
+
+
+def test_wide_layout_without_differences():
+    df = pd.DataFrame({"K": ["1"], "V": ["a"]})
+    wide = diff_directional_wide(df, df, build_key_map(df, [0]), [0], "A", "B")
+    assert wide.empty
+    assert wide.columns.tolist() == ["KEY_1", "狀態", "變更欄位數", "變更欄位", "差異來源"]
+
+
+# =========================
+# 只統計（Summary）
+# =========================
+
+def test_summary_counts_and_examples_match_full_diff():
+    df_a = pd.DataFrame({"K": ["1", "2", "3", "4"], "V": ["a", "b", "c", "d"], "W": [1, 2, 3, 4]})
+    df_b = pd.DataFrame({"K": ["1", "2", "3", "5"], "V": ["a", "x", "y", "d"], "W": [1, 2, 9, 5]})
+    map_a = build_key_map(df_a, [0])
+    map_b = build_key_map(df_b, [0])
+    a_rows, _, _, _ = diff_directional(df_a, df_b, map_a, map_b, [0], "A", "B")
+    b_rows, _, _, _ = diff_directional(df_b, df_a, map_b, map_a, [0], "B", "A")
+
+    df_counts, df_examples, stats = summarize_compare(df_a, df_b, [0], [0], max_examples=1)
+
+    counts = df_counts.set_index("差異欄位")
+    assert counts.loc["V"].tolist() == [2, 2, 4]
+    assert counts.loc["W"].tolist() == [1, 1, 2]
+    assert counts.loc["(Key不存在)"].tolist() == [1, 1, 2]
+    assert "(重複Key多出)" not in counts.index
+    assert stats["missing_in_b"] == 1 and stats["missing_in_a"] == 1
+    assert stats["matched_a"] == 3 and stats["matched_b"] == 3
+
+    # 每個方向、每個欄位最多 max_examples 筆，且就是完整結果的第一筆
+    examples = df_examples.values.tolist()
+    for rows in (a_rows, b_rows):
+        for col in ("V", "W", "(Key不存在)"):
+            first = [r for r in rows if r[1] == col][:1]
+            assert [r for r in examples if r[1] == col and r[-1] == rows[0][-1]] == first
+
+    _, df_examples, _ = summarize_compare(df_a, df_b, [0], [0])
+    assert df_examples.empty
+
+
+# =========================
+# 排序合併
+# =========================
+
+def test_numeric_keys_are_sorted_by_value():
+    df_a = pd.DataFrame({"K": [10, 20, 30, 100], "V": ["a", "b", "c", "d"]})
+    df_b = pd.DataFrame({"K": [10, 20, 100, 200], "V": ["a", "x", "d", "e"]})
+    assert detect_join(*key_order_pair(df_a, df_b, [0], [0])) == JOIN_MERGE
+
+    rows, missing_keys, matched, _ = diff_directional(df_a, df_b, None, None, [0], "A", "B", join=JOIN_MERGE)
+    assert rows == [
+        ["20", "V", "b", "x", "A→B"],
+        ["30", "(Key不存在)", "存在於A", "不存在於B", "A→B"],
+    ]
+    assert missing_keys == [("30",)] and matched == 3
+
+
+def test_merge_matches_numeric_and_text_keys_like_hash():
+    # 一邊 PLNNR 讀成數字、一邊是文字：key 字串相同就是同一個 key
+    df_a = pd.DataFrame({"PLNNR": [50000001, 50000002, 50000003], "V": ["a", "b", "c"]})
+    df_b = pd.DataFrame({"PLNNR": ["50000001", "50000002", "50000003"], "V": ["a", "b", "c"]})
+    order_a, order_b = key_order_pair(df_a, df_b, [0], [0])
+    assert detect_join(order_a, order_b) == JOIN_MERGE
+
+    map_a = build_key_map(df_a, [0])
+    map_b = build_key_map(df_b, [0])
+    for join in (JOIN_HASH, JOIN_MERGE):
+        rows, missing_keys, matched, _ = diff_directional(df_a, df_b, map_a, map_b, [0], "A", "B", join=join)
+        assert (rows, missing_keys, matched) == ([], [], 3), join
+        rows, missing_keys, matched, _ = diff_directional(df_b, df_a, map_b, map_a, [0], "B", "A", join=join)
+        assert (rows, missing_keys, matched) == ([], [], 3), join
+
+
+def test_text_keys_fall_back_to_text_order():
+    # 一邊是數字、一邊是文字時依文字排序："100" 排在 "20" 前面，不算已排序
+    df_a = pd.DataFrame({"K": [10, 20, 100], "V": [1, 2, 3]})
+    df_b = pd.DataFrame({"K": ["10", "20", "100"], "V": [1, 2, 3]})
+    assert detect_join(*key_order_pair(df_a, df_b, [0], [0])) == JOIN_HASH
+
+
+def test_merge_reports_surplus_duplicates_separately():
+    df_a = pd.DataFrame({"K": [1, 1, 1, 2], "V": ["a", "b", "c", "d"]})
+    df_b = pd.DataFrame({"K": [1, 1, 2], "V": ["a", "b", "d"]})
+
+    rows, missing_keys, matched, _ = diff_directional(df_a, df_b, None, None, [0], "A", "B", join=JOIN_MERGE)
+    assert rows == [["1", "(重複Key多出)", "存在於A", "重複Key多出一筆（B無對應列）", "A→B"]]
+    assert missing_keys == [] and matched == 3
+
+    df_counts, _, stats = summarize_compare(df_a, df_b, [0], [0], join=JOIN_MERGE)
+    assert stats["missing_in_b"] == 0 and stats["surplus_a"] == 1 and stats["surplus_b"] == 0
+    assert df_counts.set_index("差異欄位").loc["(重複Key多出)", "A→B"] == 1
+
+
+def test_b_to_a_value_columns_follow_a_then_b():
+    # 長格式與寬格式相同：不論方向，A值 一律是 A 的值
+    df_a = pd.DataFrame({"K": [1, 2], "V": ["a1", "a2"]})
+    df_b = pd.DataFrame({"K": [1, 3], "V": ["b1", "b3"]})
+    map_a = build_key_map(df_a, [0])
+    map_b = build_key_map(df_b, [0])
+
+    rows, _, _, _ = diff_directional(df_b, df_a, map_b, map_a, [0], "B", "A")
+    assert rows == [
+        ["1", "V", "a1", "b1", "B→A"],
+        ["3", "(Key不存在)", "不存在於A", "存在於B", "B→A"],
+    ]
+
+    wide = diff_directional_wide(df_b, df_a, map_a, [0], "B", "A")
+    assert wide.set_index("KEY_1").loc["1", ["V_A", "V_B"]].tolist() == ["a1", "b1"]
+
+    _, df_examples, _ = summarize_compare(df_a, df_b, [0], [0], max_examples=5)
+    b_examples = df_examples[df_examples["差異來源"] == "B→A"]
+    assert b_examples[["差異欄位", "A值", "B值"]].values.tolist() == [
+        ["(Key不存在)", "不存在於A", "存在於B"],
+        ["V", "a1", "b1"],
+    ]
+
+
+def test_merge_rejects_unsorted_keys():
+    df_a = pd.DataFrame({"K": ["b", "a"], "V": [1, 2]})
+    with pytest.raises(ValueError):
+        diff_directional(df_a, df_a, None, None, [0], "A", "B", join=JOIN_MERGE)
+
+
+# =========================
+# 比對規則
+# =========================
+
+def test_numeric_tolerance_handles_infinity():
+    rule = compile_rules({"x": [("numeric", 0.01)]})["x"]
+    prep_a = rule.prepare(pd.Series(["inf", "inf", "-inf", "1.001", "abc", ""], dtype=object))
+    prep_b = rule.prepare(pd.Series(["inf", "-inf", "-inf", "1.0", "abc", ""], dtype=object))
+    with np.errstate(all="raise"):
+        same = rule.equal(prep_a, prep_b)
+    assert same.tolist() == [True, False, True, True, True, True]
+
+
+def test_date_rule_handles_mixed_timezones():
+    rule = compile_rules({"d": ["date"]})["d"]
+    prep_a = rule.prepare(pd.Series(["2024-01-01T08:00:00+08:00", "2024-01-01", "abc", ""], dtype=object))
+    prep_b = rule.prepare(pd.Series(["2024-01-01 00:00:00", "2024/01/01", "abc", ""], dtype=object))
+    assert rule.equal(prep_a, prep_b).tolist() == [True, True, True, True]
+
+
+def test_date_rule_keeps_wall_time_without_mixed_timezones():
+    rule = compile_rules({"d": ["date"]})["d"]
+    text, _ = rule.prepare(pd.Series(["2024-01-01T08:00:00+08:00", "2024-01-02T09:30:00+08:00"], dtype=object))
+    assert text.tolist() == ["2024-01-01 08:00:00", "2024-01-02 09:30:00"]
+
+
+def test_describe_accepts_every_compilable_spec():
+    spec = {"a": [("numeric", None), "trim"], "b": [("numeric",)], "c": [("ignore_case",)]}
+    compiled = compile_rules(spec)
+    assert compiled["a"].tolerance == 0 and compiled["b"].tolerance == 0
+    assert describe_rules(spec) == "a：數值容差=0、去前後空白；b：數值容差=0；c：不分大小寫"
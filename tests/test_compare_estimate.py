@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from compare_core import JOIN_MERGE, key_text_columns
+from compare_estimate import estimate_compare, key_sample_mask
+
+
+def sample_keys(df, fraction):
+    mask = key_sample_mask(key_text_columns(df, [0]), fraction)
+    return set(key_text_columns(df, [0])[0][mask])
+
+
+# =========================
+# 依 key 抽樣
+# =========================
+
+def test_sample_picks_same_keys_on_both_sides():
+    # 一邊是數字、一邊是文字且順序 / 範圍不同：同一個 key 兩邊一定同時抽到或同時不抽
+    df_a = pd.DataFrame({"K": np.arange(20_000), "V": 0})
+    df_b = pd.DataFrame({"K": [str(k) for k in range(30_000, 5_000, -1)], "V": 0})
+    keys_a = sample_keys(df_a, 0.1)
+    keys_b = sample_keys(df_b, 0.1)
+
+    common = set(key_text_columns(df_a, [0])[0]) & set(key_text_columns(df_b, [0])[0])
+    assert keys_a & common == keys_b & common
+    assert 0.08 < len(keys_a) / len(df_a) < 0.12
+
+
+def test_full_fraction_keeps_every_row():
+    assert key_sample_mask(key_text_columns(pd.DataFrame({"K": [1, 2, 3]}), [0]), 1.0).all()
+
+
+# =========================
+# 推估
+# =========================
+
+def make_frames(n=50_000):
+    rng = np.random.default_rng(0)
+    df_a = pd.DataFrame({"K": np.arange(n), "V": rng.integers(0, 10, n)})
+    df_b = df_a.copy()
+    df_b.loc[df_b.index % 10 == 0, "V"] += 1    # 5000 列變更
+    df_b = df_b[df_b.index % 50 != 1]           # 1000 列 B 沒有
+    return df_a, df_b
+
+
+def test_small_data_is_exact():
+    df_a, df_b = make_frames(100)
+    df_estimate, df_columns, info = estimate_compare(df_a, df_b, [0], [0])
+    est = df_estimate.set_index("項目")
+    assert info["fraction"] == 1.0
+    assert est.loc["A 有、B 無的 Key 列數"].tolist() == [2, 2, 2]
+    assert est.loc["A → B 差異列數"].tolist() == [12, 12, 12]
+    assert df_columns["估計筆數"].tolist() == [10]
+
+
+def test_interval_covers_actual_counts():
+    df_a, df_b = make_frames()
+    df_estimate, df_columns, info = estimate_compare(df_a, df_b, [0], [0], target_rows=5_000)
+    est = df_estimate.set_index("項目")
+    assert info["fraction"] == 0.1
+
+    for item, actual in [("A 有、B 無的 Key 列數", 1000), ("A → B 差異列數", 6000)]:
+        value, lo, hi = est.loc[item].tolist()
+        assert lo <= actual <= hi, item
+        assert lo <= value <= hi, item
+
+    row = df_columns.set_index("差異欄位").loc["V"]
+    assert row["下限"] <= 5000 <= row["上限"]
+
+
+def test_merge_adds_surplus_rows():
+    df_a = pd.DataFrame({"K": [1, 1, 2, 3], "V": ["a", "b", "c", "d"]})
+    df_b = pd.DataFrame({"K": [1, 2, 3], "V": ["a", "c", "d"]})
+    df_estimate, _, _ = estimate_compare(df_a, df_b, [0], [0], join=JOIN_MERGE)
+    est = df_estimate.set_index("項目")
+    assert est.loc["A 重複 Key 多出列數（B 無對應列）", "估計值"] == 1
+    assert est.loc["A → B 差異列數", "估計值"] == 1
@@ -0,0 +1,62 @@
+import pandas as pd
+
+from compare_workbook import compare_workbooks, pair_sheets
+
+
+# =========================
+# 工作表配對
+# =========================
+
+def test_pair_sheets_exact_then_cleaned_names():
+    pairs, only_a, only_b = pair_sheets(["Ops", "Header ", "OnlyA"], ["header", "Ops", "OnlyB"])
+    assert pairs == [("Ops", "Ops"), ("Header ", "header")]
+    assert only_a == ["OnlyA"]
+    assert only_b == ["OnlyB"]
+
+
+def test_pair_sheets_prefers_exact_match_over_cleaned():
+    pairs, only_a, only_b = pair_sheets(["Ops", "OPS"], ["OPS", "ops"])
+    assert pairs == [("Ops", "ops"), ("OPS", "OPS")]
+    assert only_a == [] and only_b == []
+
+
+# =========================
+# 多工作表比對
+# =========================
+
+def test_compare_workbooks_combines_sheets():
+    sheets_a = {
+        "Ops": pd.DataFrame({"PLNNR": ["P1", "P1", "P2"], "VORNR": ["10", "20", "10"], "V": ["a", "b", "c"]}),
+        "Head": pd.DataFrame({"PLNNR": ["P1"], "T": ["x"]}),
+        "OnlyA": pd.DataFrame({"K": [1]}),
+    }
+    sheets_b = {
+        "Ops": pd.DataFrame({"PLNNR": ["P1", "P1", "P3"], "VORNR": ["10", "20", "10"], "V": ["a", "B", "c"]}),
+        "head": pd.DataFrame({"PLNNR": ["P1"], "T": ["x"]}),
+    }
+    df_summary, df_a_to_b, df_b_to_a = compare_workbooks(sheets_a, sheets_b, max_workers=1)
+
+    summary = df_summary.set_index("工作表")
+    assert summary.loc["Ops", "狀態"] == "OK"
+    assert summary.loc["Ops", "A → B 差異列數"] == 2
+    assert summary.loc["Head / head", "A → B 差異列數"] == 0
+    assert summary.loc["OnlyA", "狀態"] == "B 缺少此工作表"
+
+    # 單一 Key 的工作表 KEY_2 補空白；值欄一律是 (A值, B值)
+    assert df_a_to_b.columns.tolist() == ["工作表", "KEY_1", "KEY_2", "差異欄位", "A值", "B值", "差異來源"]
+    assert df_a_to_b.values.tolist() == [
+        ["Ops", "P1", "20", "V", "b", "B", "A→B"],
+        ["Ops", "P2", "10", "(Key不存在)", "存在於A", "不存在於B", "A→B"],
+    ]
+    assert df_b_to_a.values.tolist() == [
+        ["Ops", "P1", "20", "V", "b", "B", "B→A"],
+        ["Ops", "P3", "10", "(Key不存在)", "不存在於A", "存在於B", "B→A"],
+    ]
+
+
+def test_compare_workbooks_reports_missing_key_column():
+    sheets_a = {"S": pd.DataFrame({"PLNNR": ["P1"], "VORNR": ["10"]})}
+    sheets_b = {"S": pd.DataFrame({"PLNNR": ["P1"], "X": ["10"]})}
+    df_summary, df_a_to_b, df_b_to_a = compare_workbooks(sheets_a, sheets_b, max_workers=1)
+    assert df_summary.loc[0, "狀態"] == "B 缺少 Key 欄位：VORNR"
+    assert df_a_to_b.empty and df_b_to_a.empty
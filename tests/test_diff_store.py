@@ -0,0 +1,92 @@
+import pandas as pd
+
+from diff_store import DiffStore
+
+HEADERS = ["KEY_1", "差異欄位", "A值", "B值", "差異來源"]
+
+
+def make_store():
+    df_a_to_b = pd.DataFrame([
+        ["1", 2023, "x", "y", "A→B"],
+        ["2", "V", "p", "q", "A→B"],
+    ], columns=HEADERS)
+    df_b_to_a = pd.DataFrame([
+        ["3", "(Key不存在)", "不存在於A", "存在於B", "B→A"],
+    ], columns=HEADERS)
+    return DiffStore(df_a_to_b, df_b_to_a, ["KEY_1"])
+
+
+# =========================
+# 數字欄位名稱
+# =========================
+
+def test_numeric_headers_filter_by_displayed_text():
+    # 篩選選項是 diff_columns 的字串，數字欄位名稱也要篩得到
+    store = make_store()
+    assert "2023" in store.diff_columns
+    assert store.count(columns=["2023"]) == 1
+
+
+def test_select_keeps_raw_header_values():
+    store = make_store()
+    assert store.select(columns=["2023"])["差異欄位"].tolist() == [2023]
+
+    df_page, total = store.page(1, 10, columns=["2023"])
+    assert total == 1 and df_page["差異欄位"].tolist() == ["2023"]
+
+
+# =========================
+# 篩選 / 分頁 / 欄位統計
+# =========================
+
+def make_two_key_store():
+    headers = ["KEY_1", "KEY_2", "差異欄位", "A值", "B值", "差異來源"]
+    df_a_to_b = pd.DataFrame([
+        ["P1", "10", "V", "a", "b", "A→B"],
+        ["P1", "20", "W", "c", "d", "A→B"],
+        ["P2", "10", "V", "e", "f", "A→B"],
+    ], columns=headers)
+    df_b_to_a = pd.DataFrame([
+        ["P3", "10", "(Key不存在)", "不存在於A", "存在於B", "B→A"],
+        ["P1", "10", "V", "a", "b", "B→A"],
+    ], columns=headers)
+    return DiffStore(df_a_to_b, df_b_to_a, ["KEY_1", "KEY_2"])
+
+
+def test_filters_combine_column_source_and_key_prefix():
+    store = make_two_key_store()
+    assert len(store) == 5
+    assert store.sources == ["A→B", "B→A"]
+    assert store.count(columns=["V"]) == 3
+    assert store.count(columns=["V"], sources=["A→B"]) == 2
+    # 多 Key 以「|」串起來比對前綴
+    assert store.count(key_prefix="P1|1") == 2
+    assert store.count(columns=["W"], key_prefix="P2") == 0
+
+
+def test_page_returns_slice_and_filtered_total():
+    store = make_two_key_store()
+    df_page, total = store.page(2, 2)
+    assert total == 5
+    assert df_page[["KEY_1", "差異來源"]].values.tolist() == [["P2", "A→B"], ["P3", "B→A"]]
+
+    df_page, total = store.page(1, 10, sources=["B→A"])
+    assert total == 2 and df_page["KEY_1"].tolist() == ["P3", "P1"]
+
+    df_page, total = store.page(3, 10)
+    assert total == 5 and df_page.empty
+
+
+def test_column_counts_split_by_source():
+    counts = make_two_key_store().column_counts().set_index("差異欄位")
+    assert counts.columns.tolist() == ["A→B", "B→A", "合計"]
+    assert counts.index[0] == "V"
+    assert counts.loc["V"].tolist() == [2, 1, 3]
+    assert counts.loc["W"].tolist() == [1, 0, 1]
+    assert counts.loc["(Key不存在)"].tolist() == [0, 1, 1]
+
+
+def test_empty_store():
+    store = DiffStore(pd.DataFrame(columns=HEADERS), pd.DataFrame(columns=HEADERS), ["KEY_1"])
+    df_page, total = store.page(1, 10)
+    assert len(store) == 0 and total == 0 and df_page.columns.tolist() == HEADERS
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from telemetry import append_record, latency_percentiles, load_records, write_calibration
+
+
+def record(mode, rows, seconds, **fields):
+    return {"mode": mode, "rows_a": rows, "rows_b": rows, "total_seconds": seconds, **fields}
+
+
+# =========================
+# 紀錄讀寫
+# =========================
+
+def test_load_records_expands_stages_and_skips_bad_lines(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    append_record(record("full", 100, 1.0, stages={"diff": 0.5, "store": 0.1}), path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("{not json\n\n")
+    append_record(record("count_only", 60_000, 2.0, stages={}), path)
+
+    df = load_records(path)
+    assert df["mode"].tolist() == ["full", "count_only"]
+    assert df.loc[0, "stage_diff"] == 0.5 and pd.isna(df.loc[1, "stage_diff"])
+    assert "stages" not in df.columns
+    # 資料量 = A + B 列數
+    assert df["size_bucket"].astype(str).tolist() == ["< 1萬", "10萬–100萬"]
+
+
+def test_load_records_without_file(tmp_path):
+    assert load_records(tmp_path / "missing.jsonl").empty
+
+
+# =========================
+# 統計
+# =========================
+
+def test_latency_percentiles_per_group():
+    df = pd.DataFrame([record("full", 100, float(s)) for s in range(1, 101)] + [record("count_only", 100, 7.0)])
+    out = latency_percentiles(df, ["mode"]).set_index("mode")
+    assert out.columns.tolist() == ["次數", "p50", "p95", "p99"]
+    assert out.loc["full"].tolist() == [100, 50.5, 95.05, 99.01]
+    assert out.loc["count_only"].tolist() == [1, 7.0, 7.0, 7.0]
+
+
+def test_write_calibration_uses_only_calibration_modes():
+    df = pd.DataFrame([
+        record("xlsx_download", 1, 0, result_rows=2000, stage_xlsx=2.0, result_bytes=200_000),
+        record("multi_sheet", 1, 0, result_rows=4000, stage_xlsx=2.0, result_bytes=200_000),
+        # 只統計模式：result_rows 是範例數，不列入
+        record("count_only", 1, 0, result_rows=5000, stage_xlsx=500.0, result_bytes=1),
+        # 結果太少，不列入
+        record("xlsx_download", 1, 0, result_rows=10, stage_xlsx=5.0, result_bytes=1),
+    ])
+    out = write_calibration(df)
+    assert out["write_seconds_per_row"] == pytest.approx(0.00075)
+    assert out["bytes_per_row"] == pytest.approx(75)
+
+    assert write_calibration(df[df["mode"] == "count_only"]) == {
+        "write_seconds_per_row": None,
+        "bytes_per_row": None,
+    }
+    assert write_calibration(pd.DataFrame())["bytes_per_row"] is None